@@ -3,22 +3,51 @@ Dispatcher for running multiple traffic simulations with different parameter com
 Supports both multiprocessing (for cluster/parallel execution) and threading.
 """
 
-import itertools
+import csv
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
-from typing import Iterator, Dict, Any, List, Tuple, Optional
+import os
+import sys
+import threading
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from collections import Counter, deque
+from itertools import islice
+from typing import Iterable, Iterator, Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 import time
 from datetime import datetime
 
+import numpy as np
+
+import model_kernels
 from model import IntersectionModel
 from parameters import ModelParameters
-from logger import CSVLogger
+from logger import CSVLogger, FIELDNAMES
+
+# Upper bound on the number of configurations sent to a worker as one task
+MAX_CHUNKSIZE = 64
+
+# A progress line is printed every PROGRESS_EVERY completed simulations
+PROGRESS_EVERY = 64
+
+# Per-worker cache of the IntersectionModel reused by run_single_simulation().
+# Thread-local so that threads of a ThreadPoolExecutor each get their own model.
+_worker_state = threading.local()
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SimulationConfig:
-    """Configuration for a single simulation run."""
+    """
+    Configuration for a single simulation run.
+
+    Instances are slotted and immutable, and pickle as a flat tuple of their
+    field values to keep the payload sent to worker processes small.
+    """
 
     # System parameters
     length: int
@@ -43,19 +72,49 @@ class SimulationConfig:
         """Convert to dictionary for logging."""
         return asdict(self)
 
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (
+                self.length,
+                self.vmax,
+                self.t_green,
+                self.injection_rate,
+                self.p_b,
+                self.p_chg,
+                self.p_red,
+                self.p_skid,
+                self.steps,
+                self.metrics_start_step,
+                self.config_id,
+            ),
+        )
+
+    @classmethod
+    def from_record(cls, record: np.record) -> "SimulationConfig":
+        """Build a config from a row of the generate_parameter_grid() table."""
+        return cls(**{name: record[name].item() for name in record.dtype.names})
 
-def run_single_simulation(config: SimulationConfig) -> Dict[str, Any]:
+
+def run_single_simulation(
+    config: SimulationConfig | np.record,
+    seed: Optional[int | np.random.SeedSequence] = None,
+) -> Tuple[Any, ...]:
     """
     Run a single simulation with the given configuration.
 
     Args:
-        config: SimulationConfig object with all parameters
+        config: SimulationConfig object, or a row of generate_parameter_grid()
+        seed: Seed for the model's random number generator (None = unpredictable)
 
     Returns:
-        Dictionary containing both parameters and metrics
+        Tuple with the parameters and metrics, in logger.FIELDNAMES order
     """
     start_time = time.time()
 
+    if not isinstance(config, SimulationConfig):
+        config = SimulationConfig.from_record(config)
+
     # Create model parameters
     params = ModelParameters(
         p_b=config.p_b,
@@ -64,133 +123,567 @@ def run_single_simulation(config: SimulationConfig) -> Dict[str, Any]:
         p_skid=config.p_skid,
     )
 
-    # Create and run model
-    model = IntersectionModel(
-        length=config.length,
-        vmax=config.vmax,
-        t_green=config.t_green,
-        injection_rate=config.injection_rate,
-        params=params,
-        metrics_start_step=config.metrics_start_step,
-    )
+    # Create the model on the first run of this worker and reset it afterwards,
+    # reusing its buffers
+    model = getattr(_worker_state, "model", None)
+    if model is None:
+        model = IntersectionModel(
+            length=config.length,
+            vmax=config.vmax,
+            t_green=config.t_green,
+            injection_rate=config.injection_rate,
+            params=params,
+            metrics_start_step=config.metrics_start_step,
+            seed=seed,
+        )
+        _worker_state.model = model
+    else:
+        model.reset(
+            length=config.length,
+            vmax=config.vmax,
+            t_green=config.t_green,
+            injection_rate=config.injection_rate,
+            params=params,
+            metrics_start_step=config.metrics_start_step,
+            seed=seed,
+        )
 
     model.run_simulation(steps=config.steps)
 
-    # Get results
+    # Build the CSV row directly, in FIELDNAMES order
     metrics = model.get_metrics()
-    params_dict = model.get_params()
+    return (
+        datetime.now().isoformat(),
+        config.config_id,
+        config.length,
+        config.vmax,
+        config.t_green,
+        config.injection_rate,
+        config.p_b,
+        config.p_chg,
+        config.p_red,
+        config.p_skid,
+        config.steps,
+        config.metrics_start_step,
+        metrics["n_lateral"],
+        metrics["n_rear_end"],
+        metrics["n_vehicles"],
+        metrics["throughput"],
+        metrics["lateral_to_rear_end_ratio"],
+        metrics["time"],
+        time.time() - start_time,
+        metrics["completed_vehicles"],
+        metrics["avg_travel_time"],
+        metrics["avg_speed"],
+    )
+
+
+# Fields that identify a configuration (everything except the config_id)
+CONFIG_KEY_FIELDS = (
+    "length",
+    "vmax",
+    "t_green",
+    "injection_rate",
+    "p_b",
+    "p_chg",
+    "p_red",
+    "p_skid",
+    "steps",
+    "metrics_start_step",
+)
+_CONFIG_KEY_TYPES = (int, int, int, float, float, float, float, float, int, int)
+_CONFIG_KEY_COLUMNS = tuple(FIELDNAMES.index(name) for name in CONFIG_KEY_FIELDS)
+
+
+def config_key(config: SimulationConfig | np.record) -> Tuple[Any, ...]:
+    """Returns the values that identify a configuration, as plain Python numbers."""
+    return tuple(
+        cast(getattr(config, name))
+        for name, cast in zip(CONFIG_KEY_FIELDS, _CONFIG_KEY_TYPES)
+    )
+
+
+def _run_or_capture(config: SimulationConfig) -> Tuple[Any, ...] | Exception:
+    """
+    Run a single simulation, returning the exception instead of raising it.
+
+    executor.map() stops at the first exception it re-raises, so failures are
+    passed back as values to keep the remaining simulations running.
+    """
+    try:
+        return run_single_simulation(config)
+    except Exception as exc:
+        return exc
+
+
+def _run_chunk(configs: List[SimulationConfig]) -> List[Tuple[Any, ...] | Exception]:
+    """
+    Run a chunk of simulations in one task and return all of their results.
+
+    Results travel back to the dispatcher as one list per chunk, which the
+    dispatcher writes to the CSV file in a single call.
+    """
+    return [_run_or_capture(config) for config in configs]
+
+
+def _iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive lists of at most `size` elements of `items`, lazily."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _worker_init(worker_counter=None, cpus: Optional[List[int]] = None):
+    """
+    Prepare a worker when the pool starts: compile (or load from cache) the
+    numba kernels.
+
+    Args:
+        worker_counter: Shared multiprocessing.Value used to number the workers;
+            when given, the worker pins itself to cpus[number % len(cpus)]
+        cpus: CPUs available to the pool
+    """
+    if worker_counter is not None:
+        with worker_counter.get_lock():
+            index = worker_counter.value
+            worker_counter.value += 1
+        # Keeps the worker (and its warm caches) on one core
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+        if model_kernels.HAVE_NUMBA:
+            import numba
+
+            # nasch_step links the parallel=True kernel used with
+            # model_kernels.PARALLEL_ROADS, so loading it starts numba's thread
+            # pool; limit it to one thread so it cannot crowd the pinned core
+            numba.set_num_threads(1)
+
+    model_kernels.warm_jit()
+
+
+# Modules the fork server imports once, before it forks any worker
+FORKSERVER_PRELOAD = ["numpy", "model_kernels", "model", "parameters"]
+
+
+def _process_context():
+    """
+    Multiprocessing context for the worker processes.
+
+    Uses "forkserver" where available (Linux and macOS): workers are forked
+    from a small server process that has already imported numpy, numba and
+    the model, instead of re-importing them (spawn) or copying the whole
+    parent heap (fork). On Windows only "spawn" exists and the default
+    context is returned.
+    """
+    if "forkserver" not in mp.get_all_start_methods():
+        return mp.get_context()
+    ctx = mp.get_context("forkserver")
+    ctx.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return ctx
+
+
+class ShardedExecutor(Executor):
+    """
+    Pool of single-worker process pools fed round-robin.
+
+    Every worker has its own queue and task i goes to worker i % n_shards, so
+    consecutive tasks (e.g. the replications of one configuration) are spread
+    evenly over the workers instead of being picked up by whichever worker
+    happens to be free.
+    """
+
+    def __init__(
+        self, max_workers: int, mp_context=None, initializer=None, initargs=()
+    ):
+        self._shards = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=initializer,
+                initargs=initargs,
+            )
+            for _ in range(max_workers)
+        ]
+        self._next = 0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        shard = self._shards[self._next % len(self._shards)]
+        self._next += 1
+        return shard.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        for shard in self._shards:
+            shard.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def run_replicas(
+    config: SimulationConfig,
+    n_replicas: int,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[Tuple[Any, ...]]:
+    """
+    Run independent replicas of one configuration in parallel.
+
+    Each replica gets its own random stream, spawned from one SeedSequence,
+    so a seeded batch is reproducible and its replicas are statistically
+    independent. Replicas run on threads when the compiled simulation
+    releases the GIL, and on worker processes otherwise.
 
-    # Combine with configuration metadata
-    result = {
-        **params_dict,
-        **metrics,
-        "config_id": config.config_id,
-        "total_time": time.time() - start_time,
-    }
+    Args:
+        config: Configuration to replicate
+        n_replicas: Number of simulations to run
+        seed: Root seed of the batch (None = unpredictable)
+        max_workers: Number of parallel workers (default: CPU count)
 
-    return result
+    Returns:
+        One result tuple per replica (logger.FIELDNAMES order), in replica order
+    """
+    seeds = np.random.SeedSequence(seed).spawn(n_replicas)
+    max_workers = min(max_workers or mp.cpu_count(), max(n_replicas, 1))
+    if model_kernels.HAVE_NUMBA and model_kernels.STEP_RELEASES_GIL:
+        # Threads share the kernels, so compile them once here: numba's
+        # threading layer must be started from the main thread, or the
+        # interpreter can hang on exit.
+        _worker_init()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=_process_context(),
+            initializer=_worker_init,
+        )
+    with executor:
+        return list(
+            executor.map(run_single_simulation, [config] * n_replicas, seeds)
+        )
 
 
 class SimulationDispatcher:
     """
     Dispatcher for running multiple simulations with different parameter combinations.
+
+    The worker pool is created once and reused by every call to run(), so
+    repeated sweeps do not pay the worker start-up cost again. Call close()
+    when done, or use the dispatcher as a context manager.
     """
 
     def __init__(
         self,
         output_file: str = "simulation_results.csv",
-        use_multiprocessing: bool = True,
+        use_multiprocessing: Optional[bool] = None,
         max_workers: Optional[int] = None,
         verbose: bool = True,
+        sort_by_cost: bool = True,
+        pin_workers: bool = True,
+        sharded: bool = False,
     ):
         """
         Initialize the dispatcher.
 
         Args:
             output_file: CSV file to store results
-            use_multiprocessing: If True, use ProcessPoolExecutor, else ThreadPoolExecutor
-            max_workers: Maximum number of parallel workers (None = CPU count)
+            use_multiprocessing: If True, use ProcessPoolExecutor, else ThreadPoolExecutor.
+                None picks threads when the compiled simulation step releases
+                the GIL (no pickling of configs and results), processes otherwise
+            max_workers: Maximum number of parallel workers (None = CPU count).
+                Thread pools are capped at the CPU count, since extra threads
+                only add context switches
             verbose: Print progress information
+            sort_by_cost: Submit the most expensive configurations first, so
+                long simulations do not end up as stragglers at the end of a run
+            pin_workers: Pin each worker process to its own CPU (Linux only, and
+                only when there are no more workers than CPUs)
+            sharded: Give every worker process its own queue and distribute the
+                chunks round-robin (ShardedExecutor). Balances small grids with
+                many replications; for large grids the shared queue of a
+                plain ProcessPoolExecutor balances better
         """
         self.output_file = output_file
+        if use_multiprocessing is None:
+            use_multiprocessing = not (
+                model_kernels.HAVE_NUMBA and model_kernels.STEP_RELEASES_GIL
+            )
         self.use_multiprocessing = use_multiprocessing
         self.max_workers = max_workers or mp.cpu_count()
+        if not self.use_multiprocessing:
+            self.max_workers = min(self.max_workers, mp.cpu_count())
         self.verbose = verbose
+        self.sort_by_cost = sort_by_cost
+        # Number of results already stored per configuration key
+        self._seen = self._load_seen()
         self.logger = CSVLogger(filename=output_file, append=True)
 
+        if not self.use_multiprocessing:
+            # Compiled here rather than in the threads (see run_replicas)
+            _worker_init()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            ctx = _process_context()
+            initargs = ()
+            if pin_workers and hasattr(os, "sched_setaffinity"):
+                cpus = sorted(os.sched_getaffinity(0))
+                if self.max_workers <= len(cpus):
+                    initargs = (ctx.Value("i", 0), cpus)
+
+            ExecutorClass = ShardedExecutor if sharded else ProcessPoolExecutor
+            self._executor = ExecutorClass(
+                max_workers=self.max_workers,
+                mp_context=ctx,
+                initializer=_worker_init,
+                initargs=initargs,
+            )
+
+    def _executor_name(self) -> str:
+        """Short description of the worker pool, for progress output."""
+        if isinstance(self._executor, ShardedExecutor):
+            return "multiprocessing (sharded)"
+        return "multiprocessing" if self.use_multiprocessing else "threading"
+
+    def _load_seen(self) -> Counter:
+        """Counts the results already stored in the output file, per configuration."""
+        seen = Counter()
+        if not os.path.exists(self.output_file):
+            return seen
+
+        with open(self.output_file, newline="") as csvfile:
+            for row in csv.DictReader(csvfile):
+                try:
+                    key = tuple(
+                        cast(float(row[name])) if cast is int else cast(row[name])
+                        for name, cast in zip(CONFIG_KEY_FIELDS, _CONFIG_KEY_TYPES)
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue  # Incomplete or foreign row
+                seen[key] += 1
+        return seen
+
+    def close(self):
+        """Shut down the worker pool and close the results file."""
+        self._executor.shutdown(wait=True)
+        self.logger.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _iter_pending(
+        self, configs: Iterator[SimulationConfig], skipped: List[int]
+    ) -> Iterator[SimulationConfig]:
+        """
+        Yield the configurations whose results are not stored yet.
+
+        Replications are counted: a configuration listed n times is only
+        yielded as many times as needed to have n stored results. The number
+        of dropped configurations is accumulated in skipped[0].
+        """
+        available = self._seen.copy()
+        for config in configs:
+            key = config_key(config)
+            if available[key] > 0:
+                available[key] -= 1
+                skipped[0] += 1
+            else:
+                yield config
+
+    def _imap_chunks(
+        self, chunks: Iterator[List[SimulationConfig]]
+    ) -> Iterator[Tuple[List[SimulationConfig], List[Tuple[Any, ...] | Exception]]]:
+        """
+        Run chunks on the worker pool and yield (chunk, results) in order.
+
+        Unlike executor.map(), which submits the whole iterable up front, only
+        a few chunks per worker are in flight at a time, so a generator of
+        configurations is consumed as the simulations complete.
+
+        If the pool breaks (e.g. a worker process is killed), the chunks in
+        flight are reported as failed and no further chunks are submitted.
+        """
+
+        def collect(chunk, future):
+            try:
+                return chunk, future.result()
+            except BrokenExecutor as exc:
+                return chunk, [exc] * len(chunk)
+
+        in_flight = deque()
+        for chunk in chunks:
+            try:
+                future = self._executor.submit(_run_chunk, chunk)
+            except BrokenExecutor as exc:
+                print(f"Worker pool is broken, remaining simulations not run: {exc}")
+                break
+            in_flight.append((chunk, future))
+            if len(in_flight) >= self.max_workers * 2:
+                yield collect(*in_flight.popleft())
+        while in_flight:
+            yield collect(*in_flight.popleft())
+
     def run(
         self,
         configs: Iterator[SimulationConfig] | List[SimulationConfig],
-    ) -> List[Dict[str, Any]]:
+        force: bool = False,
+        total: Optional[int] = None,
+    ) -> List[Tuple[Any, ...]] | int:
         """
         Run simulations for all configurations.
 
+        Configurations whose results are already in the output file are skipped.
+        Replications are counted: a configuration listed n times only runs as
+        many times as needed to have n stored results.
+
         Args:
             configs: Iterator or list of SimulationConfig objects
+            force: Run every configuration, even if its results are already stored
+            total: Number of configurations, if known. When given, configs is
+                streamed to the workers instead of being turned into a list
+                first (and is not sorted by cost), and the result rows are only
+                written to the output file
 
         Returns:
-            List of result dictionaries
+            List of result rows (of the simulations that ran), with fields in
+            logger.FIELDNAMES order; when streaming, the number of simulations
+            that ran
         """
-        # Convert to list if iterator
-        config_list = list(configs)
-        total_sims = len(config_list)
-
-        if self.verbose:
-            print(f"Starting {total_sims} simulations...")
+        skipped = [0]
+        if total is None:
+            # Convert to list if iterator
+            config_list = list(configs)
+            if not force and self._seen:
+                config_list = list(self._iter_pending(config_list, skipped))
+
+            if self.sort_by_cost:
+                # Longest-processing-time first: cell updates scale with steps * length * (vmax + 1)
+                config_list.sort(key=lambda c: -(c.steps * c.length * (c.vmax + 1)))
+
+            total_sims = len(config_list)
+            pending = config_list
+        else:
+            total_sims = total
+            pending = configs
+            if not force and self._seen:
+                pending = self._iter_pending(configs, skipped)
+
+        if skipped[0] and self.verbose:
             print(
-                f"Using {'multiprocessing' if self.use_multiprocessing else 'threading'}"
+                f"Skipping {skipped[0]} simulations already stored in {self.output_file}"
             )
+
+        if total_sims == 0:
+            if self.verbose:
+                print("Nothing to run.")
+            return [] if total is None else 0
+
+        if self.verbose:
+            if total is not None and not force and self._seen:
+                # Stored configurations are only found as the stream reaches them
+                print(
+                    f"Starting up to {total_sims} simulations "
+                    f"(configurations already stored are skipped as they come up)..."
+                )
+            else:
+                print(f"Starting {total_sims} simulations...")
+            print(f"Using {self._executor_name()}")
             print(f"Max workers: {self.max_workers}")
             print(f"Results will be saved to: {self.output_file}")
             print("-" * 80)
 
-        results = []
+        # Streaming keeps memory flat: the rows only go to the CSV file
+        results = [] if total is None else None
+        n_ok = 0
         start_time = time.time()
 
-        ExecutorClass = (
-            ProcessPoolExecutor if self.use_multiprocessing else ThreadPoolExecutor
-        )
-
-        with ExecutorClass(max_workers=self.max_workers) as executor:
-            future_to_config = {
-                executor.submit(run_single_simulation, config): config
-                for config in config_list
-            }
-
-            # Process completed simulations
-            for i, future in enumerate(as_completed(future_to_config), 1):
-                config = future_to_config[future]
+        # Ship configs to the workers in chunks to cut per-task IPC overhead;
+        # each chunk comes back as one list of results and one CSV write.
+        # Small grids keep chunksize=1 so every worker gets something to do.
+        if total_sims <= self.max_workers * 2:
+            chunksize = 1
+        else:
+            chunksize = min(
+                MAX_CHUNKSIZE, max(1, total_sims // (self.max_workers * 4))
+            )
 
-                try:
-                    result = future.result()
-                    results.append(result)
-
-                    # Log to CSV
-                    self.logger.log(result)
-
-                    if self.verbose:
-                        elapsed = time.time() - start_time
-                        avg_time = elapsed / i
-                        eta = avg_time * (total_sims - i)
-                        print(
-                            f"[{i}/{total_sims}] Completed config_id={config.config_id} "
-                            f"| Elapsed: {elapsed:.1f}s | ETA: {eta:.1f}s"
-                        )
-
-                except Exception as exc:
+        # Skips found while streaming count as done, so the progress total
+        # stays fixed (the list path has dropped them from total_sims already)
+        streamed_skips = skipped if total is not None else [0]
+
+        # Process completed chunks (in submission order)
+        i = 0
+        last_config_id = None
+        for chunk, chunk_results in self._imap_chunks(_iter_chunks(pending, chunksize)):
+            prev_i = i
+            i += len(chunk)
+            last_config_id = chunk[-1].config_id
+
+            chunk_ok = []
+            for config, result in zip(chunk, chunk_results):
+                if isinstance(result, Exception):
                     print(
-                        f"Simulation {config.config_id} generated an exception: {exc}"
+                        f"Simulation {config.config_id} generated an exception: {result}"
+                    )
+                    continue
+                chunk_ok.append(result)
+
+            # Log the whole chunk to CSV at once
+            n_ok += len(chunk_ok)
+            if results is not None:
+                results.extend(chunk_ok)
+            self.logger.log_many(chunk_ok)
+            for row in chunk_ok:
+                self._seen[
+                    tuple(
+                        cast(row[column])
+                        for column, cast in zip(_CONFIG_KEY_COLUMNS, _CONFIG_KEY_TYPES)
                     )
+                ] += 1
+
+            # Progress goes to stderr once every PROGRESS_EVERY simulations;
+            # timing and formatting are only done when printing
+            if self.verbose and i // PROGRESS_EVERY != prev_i // PROGRESS_EVERY:
+                self._print_progress(
+                    i, total_sims, start_time, last_config_id, skipped=streamed_skips[0]
+                )
+
+        if self.verbose and i % PROGRESS_EVERY:
+            self._print_progress(
+                i, total_sims, start_time, last_config_id, skipped=streamed_skips[0]
+            )
+
+        # Make sure every result is on disk before returning
+        self.logger.flush()
 
         total_time = time.time() - start_time
 
         if self.verbose:
+            if total is not None and skipped[0]:
+                print(
+                    f"Skipped {skipped[0]} simulations already stored in {self.output_file}"
+                )
             print("-" * 80)
             print(f"All simulations completed in {total_time:.2f} seconds")
-            print(f"Average time per simulation: {total_time/total_sims:.2f} seconds")
+            if i:
+                print(f"Average time per simulation: {total_time/i:.2f} seconds")
             print(f"Results saved to: {self.output_file}")
 
-        return results
+        return n_ok if results is None else results
+
+    @staticmethod
+    def _print_progress(
+        done: int, total: int, start_time: float, config_id, skipped: int = 0
+    ):
+        """
+        Write one progress line with the elapsed time and ETA to stderr.
+
+        skipped configurations (already stored) count towards the progress but
+        not towards the time per simulation used for the ETA.
+        """
+        elapsed = time.time() - start_time
+        eta = elapsed / done * (total - done - skipped)
+        sys.stderr.write(
+            f"[{done + skipped}/{total}] Completed config_id={config_id} "
+            f"| Elapsed: {elapsed:.1f}s | ETA: {eta:.1f}s\n"
+        )
 
 
 def generate_parameter_grid(
@@ -205,10 +698,15 @@ def generate_parameter_grid(
     steps: int = 100000,
     metrics_start_step: int = 0,
     replications: int = 1,
-) -> List[SimulationConfig]:
+) -> np.recarray:
     """
     Generate a grid of all parameter combinations.
 
+    The grid is built column-wise with numpy.meshgrid and returned as a record
+    array (one row per simulation, same order as itertools.product). Rows are
+    turned into SimulationConfig objects by the workers, so generating large
+    grids does not construct one dataclass per combination up front.
+
     Args:
         *_values: Lists of values for each parameter
         steps: Number of simulation steps
@@ -216,45 +714,44 @@ def generate_parameter_grid(
         replications: Number of times to replicate each parameter combination (default: 1)
 
     Returns:
-        List of SimulationConfig objects
+        Record array with one SimulationConfig-shaped row per simulation
     """
-    configs = []
-    config_id = 0
-
-    for (
-        length,
-        vmax,
-        t_green,
-        injection_rate,
-        p_b,
-        p_chg,
-        p_red,
-        p_skid,
-    ) in itertools.product(
-        length_values,
-        vmax_values,
-        t_green_values,
-        injection_rate_values,
-        p_b_values,
-        p_chg_values,
-        p_red_values,
-        p_skid_values,
-    ):
-        for _ in range(replications):
-            config = SimulationConfig(
-                length=length,
-                vmax=vmax,
-                t_green=t_green,
-                injection_rate=injection_rate,
-                p_b=p_b,
-                p_chg=p_chg,
-                p_red=p_red,
-                p_skid=p_skid,
-                steps=steps,
-                metrics_start_step=metrics_start_step,
-                config_id=config_id,
-            )
-            configs.append(config)
-            config_id += 1
-
-    return configs
+    axes = [
+        np.asarray(values)
+        for values in (
+            length_values,
+            vmax_values,
+            t_green_values,
+            injection_rate_values,
+            p_b_values,
+            p_chg_values,
+            p_red_values,
+            p_skid_values,
+        )
+    ]
+    columns = [
+        np.repeat(column.ravel(), replications)
+        for column in np.meshgrid(*axes, indexing="ij")
+    ]
+    n_configs = columns[0].size
+
+    columns.append(np.full(n_configs, steps))
+    columns.append(np.full(n_configs, metrics_start_step))
+    columns.append(np.arange(n_configs))
+
+    return np.rec.fromarrays(
+        columns,
+        names=[
+            "length",
+            "vmax",
+            "t_green",
+            "injection_rate",
+            "p_b",
+            "p_chg",
+            "p_red",
+            "p_skid",
+            "steps",
+            "metrics_start_step",
+            "config_id",
+        ],
+    )
@@ -1,28 +1,35 @@
-from enum import Enum
+from dataclasses import dataclass
+from enum import IntEnum
 
+import numpy as np
 
-class Road(Enum):
+
+# The enums are IntEnums so comparisons are plain integer compares and the
+# members can be used directly as indices into per-road / per-lane arrays.
+
+
+class Road(IntEnum):
     """Represents the two perpendicular roads of the intersection."""
 
-    R1 = 1  # Vertical Axis (North-South)
-    R2 = 2  # Horizontal Axis (West-East)
+    R1 = 0  # Vertical Axis (North-South)
+    R2 = 1  # Horizontal Axis (West-East)
 
 
-class Lane(Enum):
+class Lane(IntEnum):
     """Represents the two lanes of a road."""
 
     LEFT = 0
     RIGHT = 1
 
 
-class TrafficLightState(Enum):
+class TrafficLightState(IntEnum):
     """Traffic light state for a road (R1 or R2)."""
 
     RED = 0
     GREEN = 1
 
 
-class Weather(Enum):
+class Weather(IntEnum):
     """Weather condition for the simulation."""
 
     NORMAL = 0
@@ -35,7 +42,29 @@ class Weather(Enum):
 
 
 class Vehicle:
-    """Represents a single vehicle in the model."""
+    """
+    Represents a single vehicle in the model.
+
+    The model itself stores vehicles in a VehicleArray; Vehicle objects are
+    snapshots handed out to external consumers such as the visualizer.
+    """
+
+    # Fixed attribute set: one snapshot per vehicle is built every time
+    # model.vehicles is read, so skip the per-instance __dict__
+    __slots__ = (
+        "id",
+        "road",
+        "lane",
+        "position",
+        "velocity",
+        "v_max",
+        "p_red",
+        "p_skid",
+        "collided",
+        "collision_time",
+        "entry_time",
+        "exited_intersection",
+    )
 
     def __init__(
         self,
@@ -69,3 +98,135 @@ class Vehicle:
         self.exited_intersection = (
             False  # Flag to track if vehicle has exited intersection
         )
+
+
+# ----------------------------------------------------
+# Vehicle Storage (Structure of Arrays)
+# ----------------------------------------------------
+
+
+@dataclass
+class VehicleArray:
+    """
+    Structure-of-arrays storage for all active vehicles of a model.
+
+    Slot i of every array describes one vehicle; only the first n_active slots
+    are in use. Slots are kept in injection order, so iterating over them
+    visits vehicles in the same order as the original list of Vehicle objects.
+    """
+
+    capacity: int
+    n_active: int = 0
+
+    # Names of the per-vehicle arrays, in declaration order
+    COLUMNS = (
+        "id",
+        "road",
+        "lane",
+        "position",
+        "velocity",
+        "v_max",
+        "p_red",
+        "p_skid",
+        "collided",
+        "collision_time",
+        "entry_time",
+        "exited_intersection",
+    )
+
+    def __post_init__(self):
+        self.id = np.zeros(self.capacity, dtype=np.int64)
+        self.road = np.zeros(self.capacity, dtype=np.int8)
+        self.lane = np.zeros(self.capacity, dtype=np.int8)
+        self.position = np.zeros(self.capacity, dtype=np.int32)
+        self.velocity = np.zeros(self.capacity, dtype=np.int32)
+        self.v_max = np.zeros(self.capacity, dtype=np.int32)
+        self.p_red = np.zeros(self.capacity, dtype=np.float64)
+        self.p_skid = np.zeros(self.capacity, dtype=np.float64)
+        self.collided = np.zeros(self.capacity, dtype=np.bool_)
+        self.collision_time = np.full(self.capacity, -1, dtype=np.int64)
+        self.entry_time = np.zeros(self.capacity, dtype=np.int64)
+        self.exited_intersection = np.zeros(self.capacity, dtype=np.bool_)
+
+    def __len__(self):
+        return self.n_active
+
+    def clear(self):
+        """Removes every vehicle, keeping the allocated arrays."""
+        self.n_active = 0
+
+    def _grow(self):
+        """Double the capacity of every array, keeping the active slots."""
+        self.capacity *= 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            # New slots get the same fill as freshly allocated arrays
+            fill = -1 if name == "collision_time" else 0
+            new = np.full(self.capacity, fill, dtype=old.dtype)
+            new[: self.n_active] = old[: self.n_active]
+            setattr(self, name, new)
+
+    def add(
+        self,
+        vehicle_id: int,
+        road: Road,
+        lane: Lane,
+        vmax: int,
+        p_red: float,
+        p_skid: float,
+        entry_time: int = 0,
+    ) -> int:
+        """Stores a new vehicle at position 0 and returns its slot."""
+        if self.n_active == self.capacity:
+            self._grow()
+
+        slot = self.n_active
+        self.id[slot] = vehicle_id
+        self.road[slot] = road
+        self.lane[slot] = lane
+        self.position[slot] = 0
+        self.velocity[slot] = 0
+        self.v_max[slot] = vmax
+        self.p_red[slot] = p_red
+        self.p_skid[slot] = p_skid
+        self.collided[slot] = False
+        self.collision_time[slot] = -1
+        self.entry_time[slot] = entry_time
+        self.exited_intersection[slot] = False
+        self.n_active += 1
+        return slot
+
+    def compact(self, keep: np.ndarray):
+        """
+        Drops the vehicles whose entry in `keep` is False.
+
+        Surviving vehicles are shifted down in order, so slot numbers change.
+
+        Args:
+            keep: Boolean mask over the n_active slots
+        """
+        n_keep = int(np.count_nonzero(keep))
+        for name in self.COLUMNS:
+            arr = getattr(self, name)
+            arr[:n_keep] = arr[: self.n_active][keep]
+        self.n_active = n_keep
+
+    def get_vehicle(self, slot: int) -> "Vehicle":
+        """Returns a Vehicle snapshot of the given slot (not updated afterwards)."""
+        vehicle = Vehicle(
+            vehicle_id=int(self.id[slot]),
+            road=Road(self.road[slot]),
+            lane=Lane(self.lane[slot]),
+            vmax=int(self.v_max[slot]),
+            p_red=float(self.p_red[slot]),
+            p_skid=float(self.p_skid[slot]),
+            entry_time=int(self.entry_time[slot]),
+        )
+        vehicle.position = int(self.position[slot])
+        vehicle.velocity = int(self.velocity[slot])
+        vehicle.collided = bool(self.collided[slot])
+        vehicle.collision_time = (
+            int(self.collision_time[slot]) if vehicle.collided else None
+        )
+        vehicle.exited_intersection = bool(self.exited_intersection[slot])
+        return vehicle
@@ -1,80 +1,148 @@
 import csv
 import os
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
+
+
+# Columns of the results file; result rows are tuples in this order
+FIELDNAMES = (
+    # Timestamp
+    "timestamp",
+    # Configuration metadata
+    "config_id",
+    # Model parameters
+    "length",
+    "vmax",
+    "t_green",
+    "injection_rate",
+    "p_b",
+    "p_chg",
+    "p_red",
+    "p_skid",
+    "steps",
+    "metrics_start_step",
+    # Metrics
+    "n_lateral",
+    "n_rear_end",
+    "n_vehicles",
+    "throughput",
+    "lateral_to_rear_end_ratio",
+    "time",
+    "total_time",
+    "completed_vehicles",
+    "avg_travel_time",
+    "avg_speed",
+)
 
 
 class CSVLogger:
     """
     Logger that stores simulation data to a CSV file.
     Each row represents a single simulation run with its parameters and results.
+
+    The file is kept open for the lifetime of the logger and rows are written
+    in batches, so logging a result does not cost an open()/close() pair.
+    Call flush() (or close()) to make sure every logged row is on disk.
     """
 
-    def __init__(self, filename: str = "simulation_results.csv", append: bool = True):
+    def __init__(
+        self,
+        filename: str = "simulation_results.csv",
+        append: bool = True,
+        batch_size: int = 64,
+    ):
         """
         Initialize the CSV logger.
 
         Args:
             filename: Name of the CSV file to write to
             append: If True, append to existing file. If False, overwrite.
+            batch_size: Number of buffered rows that triggers a write to disk
         """
         self.filename = filename
         self.append = append
-        self.fieldnames = [
-            # Timestamp
-            "timestamp",
-            # Configuration metadata
-            "config_id",
-            # Model parameters
-            "length",
-            "vmax",
-            "t_green",
-            "injection_rate",
-            "p_b",
-            "p_chg",
-            "p_red",
-            "p_skid",
-            "steps",
-            "metrics_start_step",
-            # Metrics
-            "n_lateral",
-            "n_rear_end",
-            "n_vehicles",
-            "throughput",
-            "lateral_to_rear_end_ratio",
-            "time",
-            "total_time",
-            "completed_vehicles",
-            "avg_travel_time",
-            "avg_speed",
-        ]
+        self.batch_size = batch_size
+        self.fieldnames = list(FIELDNAMES)
 
         # Create file with header if it doesn't exist
         if not self.append or not os.path.exists(self.filename):
             self._write_header()
 
+        self._fp = None
+        self._writer = None
+        self._buf = []
+        self._open()
+
+    @staticmethod
+    def _make_writer(csvfile):
+        """Returns a csv writer for rows in fieldnames order, with Unix line endings."""
+        return csv.writer(csvfile, lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+
+    def _open(self):
+        """Open the long-lived append handle and its cached writer."""
+        self._fp = open(self.filename, "a", newline="", buffering=1 << 20)
+        self._writer = self._make_writer(self._fp)
+
     def _write_header(self):
         """Write the CSV header to the file."""
         with open(self.filename, "w", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
-            writer.writeheader()
+            self._make_writer(csvfile).writerow(self.fieldnames)
 
-    def log(self, data: dict):
+    def log(self, row: Sequence):
         """
-        Log custom data dictionary to the CSV file.
+        Log a single row to the CSV file.
+
+        Rows are buffered and written once batch_size of them have accumulated.
 
         Args:
-            data: Dictionary with keys matching fieldnames
+            row: Values in fieldnames order, starting with the timestamp
         """
-        # Add timestamp if not present
-        if "timestamp" not in data:
-            data["timestamp"] = datetime.now().isoformat()
+        self._buf.append(row)
+        if len(self._buf) >= self.batch_size:
+            self.flush()
 
-        with open(self.filename, "a", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
-            writer.writerow(data)
+    def log_many(self, rows: list[tuple]):
+        """
+        Log several rows with a single write.
+
+        Rows still waiting in the buffer are written first, so the file keeps
+        the logging order. The file is flushed afterwards, so the rows are on
+        disk even if the process dies before close().
+
+        Args:
+            rows: Tuples of values in fieldnames order (including the timestamp)
+        """
+        if self._buf:
+            self._writer.writerows(self._buf)
+            self._buf.clear()
+        self._writer.writerows(rows)
+        self._fp.flush()
+
+    def flush(self):
+        """Write all buffered rows and flush the file to disk."""
+        if self._fp is None:
+            return
+        if self._buf:
+            self._writer.writerows(self._buf)
+            self._buf.clear()
+        self._fp.flush()
+
+    def close(self):
+        """Flush pending rows and close the file."""
+        if getattr(self, "_fp", None) is None:
+            return
+        self.flush()
+        self._fp.close()
+        self._fp = None
+        self._writer = None
 
     def clear(self):
         """Clear the CSV file and write a new header."""
+        self._buf.clear()
+        if self._fp is not None:
+            self._fp.close()
         self._write_header()
+        self._open()
+
+    def __del__(self):
+        self.close()
@@ -49,14 +49,13 @@ if __name__ == "__main__":
 
     output_file = "p_red_test.csv"
 
-    dispatcher = SimulationDispatcher(
+    with SimulationDispatcher(
         output_file=output_file,
-        use_multiprocessing=True,
+        use_multiprocessing=None,  # Threads if the compiled step releases the GIL
         max_workers=None,  # Use all available CPU cores
         verbose=True,
-    )
-
-    # Run all simulations
-    results = dispatcher.run(configs)
+    ) as dispatcher:
+        # Run all simulations (the grid fits in memory, so it is sorted by cost)
+        results = dispatcher.run(configs)
 
     print(f"\nSimulations complete! Results saved to {output_file}")
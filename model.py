@@ -1,9 +1,58 @@
-import random
-from entities import Road, Lane, TrafficLightState, Vehicle
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+from entities import Road, Lane, TrafficLightState, Vehicle, VehicleArray
+import model_kernels
+from model_kernels import (
+    HAVE_NUMBA,
+    LIGHT_PHASES,
+    U_CHG,
+    N_VEHICLE_DRAWS,
+    N_TOTALS,
+    N_WORK_ROWS,
+    T_COMPLETED,
+    T_N_LATERAL,
+    T_N_REAR_END,
+    T_N_VEHICLES,
+    T_THROUGHPUT,
+    T_TRAVEL_TIME,
+    W_NEW_POS,
+    W_NEW_VEL,
+    nasch_step,
+    occupancy_words,
+    run_steps,
+    step_positions,
+    step_velocities_vectorized,
+)
 from parameters import ModelParameters
-from typing import Tuple
+from typing import Optional, Tuple
 import time
 
+# Number of time steps covered by each pre-generated block of random draws
+RANDOM_BLOCK_STEPS = 256
+
+# Entry lanes as (road, lane) pairs, built once instead of iterating the enums
+# at every injection. Entry k uses column k of the injection draws.
+ENTRY_LANES = tuple((road, lane) for road in Road for lane in Lane)
+
+# Traffic light states (R1, R2) by phase of the light cycle
+LIGHT_CYCLE = tuple(
+    tuple(TrafficLightState(state) for state in phase) for phase in LIGHT_PHASES
+)
+
+# Cells where the lanes of R1 and R2 cross, as (R1 lane, R1 cell, R2 lane,
+# R2 cell) with the cells counted from intersection_start
+LATERAL_SITES = (
+    (Lane.LEFT, 0, Lane.RIGHT, 0),
+    (Lane.LEFT, 1, Lane.LEFT, 0),
+    (Lane.RIGHT, 0, Lane.RIGHT, 1),
+    (Lane.RIGHT, 1, Lane.LEFT, 1),
+)
+
+# Opposite lane, indexed by lane (a table lookup instead of enum comparisons)
+OTHER_LANE = (Lane.RIGHT, Lane.LEFT)
+
+
 # ----------------------------------------------------
 # Intersection Model Class
 # ----------------------------------------------------
@@ -23,6 +72,7 @@ class IntersectionModel:
         injection_rate: float,
         params: ModelParameters,
         metrics_start_step: int = 0,
+        seed: Optional[int] = None,
     ):
         """
         Initialize the intersection model.
@@ -34,6 +84,40 @@ class IntersectionModel:
             injection_rate: Probability of vehicle injection
             params: Model parameters (p_b, p_chg, p_red, p_skid)
             metrics_start_step: Time step at which to start recording metrics (default: 0)
+            seed: Seed for the random number generator (None = unpredictable)
+        """
+        self.vehicle_array = None
+        self.grid = None
+        self._u_inject = None  # (RANDOM_BLOCK_STEPS, len(ENTRY_LANES))
+        self._u_vehicle = None  # (RANDOM_BLOCK_STEPS, draw slots, N_VEHICLE_DRAWS)
+        self._work = None  # (N_WORK_ROWS, capacity) per-step scratch
+        self._occupancy = None  # (n_roads, n_lanes, words) lane bitmasks
+        self.reset(
+            length,
+            vmax,
+            t_green,
+            injection_rate,
+            params,
+            metrics_start_step=metrics_start_step,
+            seed=seed,
+        )
+
+    def reset(
+        self,
+        length: int,
+        vmax: int,
+        t_green: int,
+        injection_rate: float,
+        params: ModelParameters,
+        metrics_start_step: int = 0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Re-initialize the model for a new simulation run.
+
+        Takes the same arguments as __init__. Vehicle and random number buffers
+        are reused when the road length is unchanged, so a worker can run many
+        simulations with one model instead of allocating a new one each time.
         """
         # Simulation Parameters
         self.L = length
@@ -57,17 +141,32 @@ class IntersectionModel:
         self.L_TOTAL = self.L + self.INTERSECTION_SIZE
 
         # Simulation objects collections
-        # The 'grid' is a dictionary-based representation of the road.
-        self.grid = {r: {l: [None] * self.L_TOTAL for l in Lane} for r in Road}
-        self.vehicles = []  # List of all active Vehicle objects
+        # Vehicles are stored as a structure of arrays; a vehicle is identified
+        # by its slot in self.vehicle_array.
+        capacity = 2 * self.L_TOTAL
+        if self.vehicle_array is not None and self.vehicle_array.capacity == capacity:
+            # Reuse the buffers of the previous run (same length, not grown)
+            self.vehicle_array.clear()
+        else:
+            self.vehicle_array = VehicleArray(capacity=capacity)
+        # The 'grid' maps [road, lane, cell] to the slot of the vehicle in that
+        # cell, or -1 if the cell is empty.
+        grid_shape = (len(Road), len(Lane), self.L_TOTAL)
+        if getattr(self, "grid", None) is not None and self.grid.shape == grid_shape:
+            self.grid.fill(-1)
+        else:
+            self.grid = np.full(grid_shape, -1, dtype=np.int32)
+        # Sorted occupied cells of every lane (see the occupied property)
+        self._occupied = None
+        occupancy_shape = grid_shape[:2] + (occupancy_words(self.L_TOTAL),)
+        if self._occupancy is None or self._occupancy.shape != occupancy_shape:
+            self._occupancy = np.zeros(occupancy_shape, dtype=np.uint64)
         self.next_vehicle_id = 0
         self.time_step = 0
 
         # Traffic Light
-        self.traffic_light = {
-            Road.R1: TrafficLightState.GREEN,
-            Road.R2: TrafficLightState.RED,
-        }
+        # Indexed by road (Road is an IntEnum), so no enum hashing per lookup
+        self.traffic_light = [TrafficLightState.GREEN, TrafficLightState.RED]
 
         # Output Variables (Metrics to Measure)
         self.N_lateral = 0  # Total count of lateral collisions (red light violation)
@@ -85,66 +184,145 @@ class IntersectionModel:
         # Average speed metrics
         self.avg_velocities = 0
 
+        # Run bookkeeping, set by run_simulation()
+        self.steps = 0
+        self.simulation_time = 0.0
+
+        # Random numbers are drawn in blocks of RANDOM_BLOCK_STEPS steps from a
+        # NumPy generator instead of one Python random.random() call per decision
+        self._rng = np.random.default_rng(seed)
+        self._draw_block = -1
+        # Vehicle slots covered by each block: a high-water mark of the active
+        # vehicles, not the array capacity, doubled when injection outgrows it
+        self._draw_slots = len(ENTRY_LANES)
+
         # Define the intersection zone
         # Stop line is at the position before the intersection starts
         self.intersection_start = self.L // 2
         self.intersection_end = self.intersection_start + self.INTERSECTION_SIZE
 
+    @property
+    def occupied(self) -> list[list[list[int]]]:
+        """
+        Sorted occupied cells of every lane, [road][lane] -> list of positions,
+        so neighbour lookups are a bisection instead of a scan of the lane.
+
+        Injection and lane changes update the lists in place. Moving the
+        vehicles only marks them stale, and they are read off the grid again
+        the next time they are needed; the compiled path never needs them.
+        """
+        if self._occupied is None:
+            n_roads, n_lanes, l_total = self.grid.shape
+            cells = self._occupied_cells()
+            flat = cells.tolist()
+            positions = (cells % l_total).tolist()
+            bounds = [
+                bisect_left(flat, k * l_total) for k in range(n_roads * n_lanes + 1)
+            ]
+            lanes = [positions[a:b] for a, b in zip(bounds, bounds[1:])]
+            self._occupied = [
+                lanes[r * n_lanes : (r + 1) * n_lanes] for r in range(n_roads)
+            ]
+        return self._occupied
+
+    def _occupied_cells(self) -> np.ndarray:
+        """Flat grid indices of the occupied cells, i.e. sorted by (road, lane, cell)."""
+        return np.flatnonzero(self.grid.ravel() >= 0)
+
+    @property
+    def vehicles(self) -> list[Vehicle]:
+        """Snapshots of all active vehicles, in injection order."""
+        va = self.vehicle_array
+        return [va.get_vehicle(i) for i in range(va.n_active)]
+
+    def _refill_draws(self, headroom: int = 0):
+        """
+        Makes sure the random draw blocks cover the current step and the
+        active vehicles plus headroom new ones.
+
+        Both paths call this with headroom=len(ENTRY_LANES) at the start of a
+        step, so they redraw at the same steps and read the same stream.
+        """
+        block = self.time_step // RANDOM_BLOCK_STEPS
+        needed = self.vehicle_array.n_active + headroom
+        if block == self._draw_block and self._draw_slots >= needed:
+            return
+
+        if needed > self._draw_slots:
+            self._draw_slots = max(2 * self._draw_slots, needed)
+        if self._u_inject is None:
+            self._u_inject = np.empty(
+                (RANDOM_BLOCK_STEPS, len(ENTRY_LANES)), dtype=np.float32
+            )
+        if self._u_vehicle is None or self._u_vehicle.shape[1] != self._draw_slots:
+            self._u_vehicle = np.empty(
+                (RANDOM_BLOCK_STEPS, self._draw_slots, N_VEHICLE_DRAWS),
+                dtype=np.float32,
+            )
+        # Fill in place to avoid allocating new blocks
+        self._rng.random(dtype=np.float32, out=self._u_inject)
+        self._rng.random(dtype=np.float32, out=self._u_vehicle)
+        self._draw_block = block
+
+    def _work_buffer(self) -> np.ndarray:
+        """Per-step scratch rows (see model_kernels.W_*), grown with the vehicle capacity."""
+        capacity = self.vehicle_array.capacity
+        if self._work is None or self._work.shape[1] < capacity:
+            self._work = np.empty((N_WORK_ROWS, capacity), dtype=np.int32)
+        return self._work
+
     def should_record_metrics(self) -> bool:
         """Check if the current timestep should record metrics."""
         return self.time_step >= self.metrics_start_step
 
     def update_traffic_light(self):
         """Updates the traffic light state every T_GREEN time steps."""
-        # Full cycle T = 2 * T_GREEN
-        if (self.time_step % self.T_GREEN) == 0:
-            # Switch lights
-            if self.traffic_light[Road.R1] == TrafficLightState.GREEN:
-                self.traffic_light[Road.R1] = TrafficLightState.RED
-                self.traffic_light[Road.R2] = TrafficLightState.GREEN
-            else:
-                self.traffic_light[Road.R1] = TrafficLightState.GREEN
-                self.traffic_light[Road.R2] = TrafficLightState.RED
+        # Full cycle T = 2 * T_GREEN; the lights switch at every multiple of
+        # T_GREEN, so the state is a lookup by phase instead of a toggle
+        self.traffic_light = list(LIGHT_CYCLE[(self.time_step // self.T_GREEN) & 1])
 
     def inject_vehicle(self):
         """Tries to inject a new vehicle into the system."""
         # Implementation of vehicle injection with INJECTION_RATE 'a'
         # Tries to add a vehicle to each lane independently
 
-        # Try each combination of road and lane
-        for road in Road:
-            for lane in Lane:
-                # Try to inject with probability INJECTION_RATE
-                if random.random() > self.INJECTION_RATE:
-                    continue  # No injection for this lane
-
-                # Check if the starting position (cell 0) is free
-                if self.grid[road][lane][0] is not None:
-                    continue  # Starting position is occupied, cannot inject
-
-                # Create a new vehicle
-                new_vehicle = Vehicle(
-                    vehicle_id=self.next_vehicle_id,
-                    road=road,
-                    lane=lane,
-                    vmax=self.V_MAX_BASE,
-                    p_red=self.P_RED,
-                    p_skid=self.P_SKID,
-                    entry_time=self.time_step,
-                )
-
-                # Increment vehicle ID counter
-                self.next_vehicle_id += 1
-                if self.should_record_metrics():
-                    self.N_vehicles += 1
-
-                # Add vehicle to the grid and vehicle list
-                self.grid[road][lane][0] = new_vehicle
-                self.vehicles.append(new_vehicle)
-
-    def get_lateral_collision_vehicles(self) -> list[Vehicle]:
+        self._refill_draws(len(ENTRY_LANES))
+        u = self._u_inject[self.time_step % RANDOM_BLOCK_STEPS]
+
+        # Lanes that draw an injection (probability INJECTION_RATE) and whose
+        # starting position (cell 0) is free, checked for all lanes at once
+        inject = (u <= self.INJECTION_RATE) & (self.grid[:, :, 0].ravel() == -1)
+        if not inject.any():
+            return
+
+        record = self.should_record_metrics()
+        for k in np.flatnonzero(inject):
+            road, lane = ENTRY_LANES[k]
+
+            # Create a new vehicle
+            slot = self.vehicle_array.add(
+                vehicle_id=self.next_vehicle_id,
+                road=road,
+                lane=lane,
+                vmax=self.V_MAX_BASE,
+                p_red=self.P_RED,
+                p_skid=self.P_SKID,
+                entry_time=self.time_step,
+            )
+
+            # Increment vehicle ID counter
+            self.next_vehicle_id += 1
+            if record:
+                self.N_vehicles += 1
+
+            # Add vehicle to the grid
+            self.grid[road, lane, 0] = slot
+            if self._occupied is not None:
+                self._occupied[road][lane].insert(0, 0)
+
+    def get_lateral_collision_vehicles(self) -> list[int]:
         """
-        Returns a list of vehicles currently involved in lateral collisions.
+        Returns the slots of vehicles currently involved in lateral collisions.
         A lateral collision occurs when two vehicles from different roads happen to occupy the same space.
         This allows for 4 possible sites for lateral collisions in the intersection area.
 
@@ -154,76 +332,69 @@ class IntersectionModel:
         4. R1 RIGHT lane, cell intersection_start + 1 with R2 LEFT lane, cell intersection_start + 1
         """
 
+        # Vehicles of both roads must be inside the intersection for any site
+        # to collide, which is rarely the case; skip the site checks otherwise
+        cells = self.grid[:, :, self.intersection_start : self.intersection_end]
+        if not ((cells[Road.R1] >= 0).any() and (cells[Road.R2] >= 0).any()):
+            return []
+
         collision_vehicles = []
 
         # Check each of the 4 possible collision sites
-        site_1_r1 = self.grid[Road.R1][Lane.LEFT][self.intersection_start]
-        site_1_r2 = self.grid[Road.R2][Lane.RIGHT][self.intersection_start]
-        if site_1_r1 is not None and site_1_r2 is not None:
-            collision_vehicles.extend([site_1_r1, site_1_r2])
-
-        site_2_r1 = self.grid[Road.R1][Lane.LEFT][self.intersection_start + 1]
-        site_2_r2 = self.grid[Road.R2][Lane.LEFT][self.intersection_start]
-        if site_2_r1 is not None and site_2_r2 is not None:
-            collision_vehicles.extend([site_2_r1, site_2_r2])
-
-        site_3_r1 = self.grid[Road.R1][Lane.RIGHT][self.intersection_start]
-        site_3_r2 = self.grid[Road.R2][Lane.RIGHT][self.intersection_start + 1]
-        if site_3_r1 is not None and site_3_r2 is not None:
-            collision_vehicles.extend([site_3_r1, site_3_r2])
-
-        site_4_r1 = self.grid[Road.R1][Lane.RIGHT][self.intersection_start + 1]
-        site_4_r2 = self.grid[Road.R2][Lane.LEFT][self.intersection_start + 1]
-        if site_4_r1 is not None and site_4_r2 is not None:
-            collision_vehicles.extend([site_4_r1, site_4_r2])
+        for r1_lane, r1_offset, r2_lane, r2_offset in LATERAL_SITES:
+            site_r1 = cells[Road.R1, r1_lane, r1_offset]
+            site_r2 = cells[Road.R2, r2_lane, r2_offset]
+            if site_r1 != -1 and site_r2 != -1:
+                collision_vehicles.extend([site_r1, site_r2])
 
         return collision_vehicles
 
-    def find_front_vehicle(self, vehicle: Vehicle) -> Vehicle | None:
-        """Finds the vehicle object directly ahead in the same lane."""
-        road = self.grid[vehicle.road][vehicle.lane]
-        # Search from the cell in front of the vehicle to the end
-        for i in range(vehicle.position + 1, self.L_TOTAL):
-            if road[i] is not None:
-                return road[i]
-        return None  # No vehicle found
-
-    def get_distance_to_front_vehicle(
-        self, vehicle: Vehicle, road: Road, lane: Lane
-    ) -> int:
+    def find_front_vehicle(self, slot: int) -> int:
+        """Finds the slot of the vehicle directly ahead in the same lane (-1 if none)."""
+        va = self.vehicle_array
+        road, lane = va.road[slot], va.lane[slot]
+        occupied = self.occupied[road][lane]
+        # First occupied cell after the vehicle
+        k = bisect_right(occupied, va.position[slot])
+        if k < len(occupied):
+            return int(self.grid[road, lane, occupied[k]])
+        return -1  # No vehicle found
+
+    def get_distance_to_front_vehicle(self, slot: int, road: Road, lane: Lane) -> int:
         """Returns the distance (gap) to the vehicle ahead in the same lane."""
-        road = self.grid[road][lane]
-        # Search from the cell in front of the vehicle to the end
-        for i in range(vehicle.position + 1, self.L_TOTAL):
-            if road[i] is not None:
-                return i - vehicle.position - 1  # Gap is number of empty cells
+        position = self.vehicle_array.position[slot]
+        occupied = self.occupied[road][lane]
+        # First occupied cell after the vehicle
+        k = bisect_right(occupied, position)
+        if k < len(occupied):
+            return int(occupied[k] - position - 1)  # Gap is number of empty cells
         return self.L_TOTAL * 2  # No vehicle found, return large gap
 
-    def get_distance_to_intersection(
-        self, vehicle: Vehicle, road: Road, lane: Lane
-    ) -> int:
+    def get_distance_to_intersection(self, slot: int, road: Road, lane: Lane) -> int:
         """Returns the distance (gap) to the intersection stop line."""
+        position = self.vehicle_array.position[slot]
 
         # if intersection is green, ignore for now
         if (
             self.traffic_light[road] == TrafficLightState.RED
-            and vehicle.position < self.intersection_start
+            and position < self.intersection_start
         ):
-            return self.intersection_start - vehicle.position - 1
+            return self.intersection_start - position - 1
         else:
             return self.L_TOTAL * 2  # Already past intersection, return large gap
 
     def find_front_gap(
-        self, vehicle: Vehicle, road: Road = None, lane: Lane = None
+        self, slot: int, road: Road = None, lane: Lane = None
     ) -> Tuple[int, int, str]:
-        target_road = road if road is not None else vehicle.road
-        target_lane = lane if lane is not None else vehicle.lane
+        va = self.vehicle_array
+        target_road = road if road is not None else va.road[slot]
+        target_lane = lane if lane is not None else va.lane[slot]
 
         vehicle_gap = self.get_distance_to_front_vehicle(
-            vehicle, target_road, target_lane
+            slot, target_road, target_lane
         )
         intersection_gap = self.get_distance_to_intersection(
-            vehicle, target_road, target_lane
+            slot, target_road, target_lane
         )
 
         if vehicle_gap < intersection_gap:
@@ -235,32 +406,74 @@ class IntersectionModel:
 
         return vehicle_gap, intersection_gap, reason
 
-    def find_back_gap(self, vehicle: Vehicle, lane: Lane = None) -> int:
+    def front_gaps(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized find_front_gap() for all active vehicles in their own lane.
+
+        Returns:
+            gap_vehicle: Empty cells to the vehicle ahead (2 * L_TOTAL if none)
+            gap_light: Empty cells to the red light stop line (2 * L_TOTAL if
+                the light is green or the vehicle is past the stop line)
+            front: Slot of the vehicle ahead (-1 if none)
+        """
+        va = self.vehicle_array
+        n = va.n_active
+        far_gap = 2 * self.L_TOTAL
+        road = va.road[:n]
+        lane = va.lane[:n]
+        position = va.position[:n]
+
+        # The cell ahead of each vehicle is the next occupied cell in the
+        # sorted lane order of the occupied lists, if it is in the same lane.
+        # Collided vehicles can share a cell; its vehicle is the one the grid
+        # holds. A sentinel past the last lane ends the search.
+        cells = np.append(self._occupied_cells(), self.grid.size)
+        own = np.ravel_multi_index((road, lane, position), self.grid.shape)
+        ahead = cells[np.searchsorted(cells, own, side="right")]
+        same_lane = ahead // self.L_TOTAL == own // self.L_TOTAL
+
+        front = np.where(
+            same_lane, self.grid.ravel().take(ahead, mode="clip"), -1
+        ).astype(np.int32)
+        gap_vehicle = np.where(same_lane, ahead - own - 1, far_gap).astype(np.int32)
+
+        red = np.array(self.traffic_light) == TrafficLightState.RED
+        before_light = red[road] & (position < self.intersection_start)
+        gap_light = np.where(
+            before_light, self.intersection_start - position - 1, far_gap
+        ).astype(np.int32)
+
+        return gap_vehicle, gap_light, front
+
+    def find_back_gap(self, slot: int, lane: Lane = None) -> int:
         """
         Calculates the distance (gap) to the vehicle behind in the specified lane.
         This is the number of empty cells *between* this car and the one behind.
         If no vehicle is behind, returns a large value.
 
         Args:
-            vehicle: The vehicle for which to calculate the gap
+            slot: Slot of the vehicle for which to calculate the gap
             lane: Optional lane to check (defaults to vehicle's current lane)
         """
-        target_lane = lane if lane is not None else vehicle.lane
-        road = self.grid[vehicle.road][target_lane]
+        va = self.vehicle_array
+        position = va.position[slot]
+        target_lane = lane if lane is not None else va.lane[slot]
+
+        occupied = self.occupied[va.road[slot]][target_lane]
 
-        # Iterate from the cell behind the vehicle to the start
-        for i in range(vehicle.position - 1, -1, -1):
-            if road[i] is not None:
-                # Found a vehicle, gap is distance to it
-                return vehicle.position - i - 1
+        # Last occupied cell before the vehicle
+        k = bisect_left(occupied, position) - 1
+        if k >= 0:
+            # Found a vehicle, gap is distance to it
+            return int(position - occupied[k] - 1)
 
         return self.L_TOTAL * 2  # No vehicle found
 
     def get_other_lane(self, lane: Lane) -> Lane:
         """Returns the opposite lane."""
-        return Lane.RIGHT if lane == Lane.LEFT else Lane.LEFT
+        return OTHER_LANE[lane]
 
-    def can_change_lane(self, vehicle: Vehicle) -> bool:
+    def can_change_lane(self, slot: int, current_gap: Optional[int] = None) -> bool:
         """
         Checks if a lane change is safe and advantageous for the vehicle.
 
@@ -271,74 +484,88 @@ class IntersectionModel:
         Advantageous condition:
         1. The front gap in the other lane is larger than in current lane
 
+        Args:
+            slot: Slot of the vehicle
+            current_gap: Front gap (min of vehicle and light gaps) in the
+                current lane, if the caller already computed it
+
         Returns:
             True if lane change is safe and advantageous, False otherwise
         """
-        other_lane = self.get_other_lane(vehicle.lane)
-        other_lane_grid = self.grid[vehicle.road][other_lane]
+        va = self.vehicle_array
+        position = va.position[slot]
+        other_lane = self.get_other_lane(va.lane[slot])
+        other_lane_grid = self.grid[va.road[slot], other_lane]
 
         # Safety check 1: Cell at same position must be empty
-        if other_lane_grid[vehicle.position] is not None:
+        if other_lane_grid[position] != -1:
             return False
 
         # Safety check 2: Check vehicles behind in the other lane
-        back_gap_other = self.find_back_gap(vehicle, lane=other_lane)
-
-        # Find the vehicle behind in the other lane
-        for i in range(vehicle.position - 1, -1, -1):
-            if other_lane_grid[i] is not None:
-                vehicle_behind = other_lane_grid[i]
-                # Check if that vehicle could crash into us
-                # The vehicle behind is safe if its velocity is less than or equal to the gap
-                if vehicle_behind.velocity > back_gap_other:
-                    return False
-                break
+        # (one bisection gives both the vehicle behind and the gap to it)
+        occupied = self.occupied[va.road[slot]][other_lane]
+        k = bisect_left(occupied, position) - 1
+        if k >= 0:
+            behind = other_lane_grid[occupied[k]]
+            back_gap_other = position - occupied[k] - 1
+            # Check if that vehicle could crash into us
+            # The vehicle behind is safe if its velocity is less than or equal to the gap
+            if va.velocity[behind] > back_gap_other:
+                return False
 
         # Advantageous check: Compare front gaps
-        current_v_gap, current_i_gap, _ = self.find_front_gap(vehicle)
-        current_gap = min(current_v_gap, current_i_gap)
+        if current_gap is None:
+            current_v_gap, current_i_gap, _ = self.find_front_gap(slot)
+            current_gap = min(current_v_gap, current_i_gap)
 
-        other_v_gap, other_i_gap, _ = self.find_front_gap(vehicle, lane=other_lane)
+        other_v_gap, other_i_gap, _ = self.find_front_gap(slot, lane=other_lane)
         other_gap = min(other_v_gap, other_i_gap)
 
         # Only change if other lane has a better gap
         return other_gap > current_gap
 
-    def attempt_lane_change(
-        self,
-        vehicle: Vehicle,
-    ):
+    def attempt_lane_change(self, slot: int):
         """
         Attempts to change lane for a vehicle if conditions are met.
         This should be called before velocity calculations.
 
         Args:
-            vehicle: The vehicle attempting to change lanes
+            slot: Slot of the vehicle attempting to change lanes
         """
+        va = self.vehicle_array
+
         # Don't change lanes if already collided
-        if vehicle.collided:
+        if va.collided[slot]:
             return
 
         # Check current front gap and reason
-        _, _, reason = self.find_front_gap(vehicle)
+        vehicle_gap, intersection_gap, reason = self.find_front_gap(slot)
 
         # Only consider lane change if blocked by a vehicle
         if reason != "vehicle":
             return
 
         # Check if lane change is safe and advantageous
-        if self.can_change_lane(vehicle) and random.random() < self.P_CHG:
+        u = self._u_vehicle[self.time_step % RANDOM_BLOCK_STEPS, slot]
+        if (
+            self.can_change_lane(slot, min(vehicle_gap, intersection_gap))
+            and u[U_CHG] < self.P_CHG
+        ):
             # Perform the lane change
-            other_lane = self.get_other_lane(vehicle.lane)
+            road = va.road[slot]
+            position = int(va.position[slot])
+            other_lane = self.get_other_lane(va.lane[slot])
 
             # Remove from current lane
-            self.grid[vehicle.road][vehicle.lane][vehicle.position] = None
+            self.grid[road, va.lane[slot], position] = -1
+            self.occupied[road][va.lane[slot]].remove(position)
 
             # Update vehicle's lane
-            vehicle.lane = other_lane
+            va.lane[slot] = other_lane
 
             # Place in new lane
-            self.grid[vehicle.road][other_lane][vehicle.position] = vehicle
+            self.grid[road, other_lane, position] = slot
+            insort(self.occupied[road][other_lane], position)
 
     def apply_nasch_rules(self):
         """
@@ -348,177 +575,109 @@ class IntersectionModel:
         2. Collision Check: Detect and resolve lateral and rear-end collisions.
         3. Update: Apply final moves to the grid.
         """
-        for vehicle in self.vehicles:
-            self.attempt_lane_change(vehicle)
-
-        # Stores the intended state {'pos': int, 'vel': int} for each vehicle
-        new_vehicles_state = {}
-        # Stores vehicles intending to enter the intersection {Road.R1: [v1, v2], R2: [v3]}
-        intersection_entrants = {Road.R1: [], Road.R2: []}
+        if HAVE_NUMBA:
+            self._apply_nasch_rules_compiled()
+            return
 
-        # --- PHASE 1: Calculate intended moves for all vehicles ---
-        for vehicle in self.vehicles:
-            if vehicle.collided:
-                # If already collided, it doesn't move.
-                new_vehicles_state[vehicle] = {"pos": vehicle.position, "vel": 0}
-                continue
-
-            v_i = vehicle.velocity
-            distance_to_vehicle, distance_to_intersection, reason = self.find_front_gap(
-                vehicle
-            )
+        va = self.vehicle_array
+        n = va.n_active
+        # Decided once per step; the event counters below are locals and are
+        # added to the model totals at the end of the step
+        record = self.should_record_metrics()
 
-            # --- Rule 1 (acceleration) ---
-            v_new = min(v_i + 1, vehicle.v_max)
+        self._refill_draws()
+        u = self._u_vehicle[self.time_step % RANDOM_BLOCK_STEPS]
 
-            # --- Rule 2 (safety distance) ---
-            can_advance_safely = (
-                v_new <= distance_to_vehicle and v_new <= distance_to_intersection
-            )
+        for slot in range(n):
+            self.attempt_lane_change(slot)
 
-            # CASE: Distance because of car
-            if reason == "vehicle" and not can_advance_safely:
-                front_vehicle = self.find_front_vehicle(vehicle)
-                # Crash into the vehicle ahead with probability p_skid
-                if front_vehicle and random.random() < vehicle.p_skid:
-                    if self.should_record_metrics():
-                        self.N_rear_end += 1
-
-                    # Mark both vehicles as collided
-                    vehicle.collided = True
-                    vehicle.collision_time = self.time_step
-                    front_vehicle.collided = True
-                    front_vehicle.collision_time = self.time_step
-
-                    # The vehicle fails to slow down and hits the car in front.
-                    # Both vehicles stay where they were
-                    new_pos = vehicle.position
-                    v_new = 0
-
-                    # Update front vehicle's state to stay in place
-                    new_vehicles_state[front_vehicle] = {
-                        "pos": front_vehicle.position,
-                        "vel": 0,
-                    }
-                else:
-                    v_new = distance_to_vehicle
-
-            # CASE: Distance because of red light
-            elif reason == "red_light" and not can_advance_safely:
-                # Ignore red light with probability p_red
-                if random.random() < vehicle.p_red:
-                    # Vehicle decides to run the red light
-                    pass  # No speed adjustment, proceed as normal
-                else:
-                    v_new = distance_to_intersection
-
-            # Random braking
-            if v_new > 0 and random.random() < self.P_B:
-                v_new -= 1
-
-            new_pos = vehicle.position + v_new
-            new_vehicles_state[vehicle] = {"pos": new_pos, "vel": v_new}
-
-            # --- Check if this move enters the intersection ---
-            is_in_intersection = (
-                new_pos >= self.intersection_start and new_pos < self.intersection_end
-            )
-
-            if is_in_intersection:
-                if not vehicle.collided:
-                    intersection_entrants[vehicle.road].append(vehicle)
+        # --- PHASE 1: Calculate intended moves for all vehicles ---
+        far_gap = 2 * self.L_TOTAL
+        gap_vehicle, gap_light, front = self.front_gaps()
+
+        work = self._work_buffer()
+        new_vel = work[W_NEW_VEL, :n]
+        n_rear_end = step_velocities_vectorized(
+            va.velocity[:n],
+            va.v_max[:n],
+            gap_vehicle,
+            gap_light,
+            front,
+            va.collided[:n],
+            va.collision_time[:n],
+            va.p_red[:n],
+            va.p_skid[:n],
+            self.P_B,
+            u,
+            far_gap,
+            self.time_step,
+            new_vel,
+        )
+        new_pos = step_positions(va.position[:n], new_vel, work[W_NEW_POS, :n])
 
         # --- PHASE 2: Check for Lateral Collisions ---
         collided_vehicles = self.get_lateral_collision_vehicles()
-        for vehicle in collided_vehicles:
-            if not vehicle.collided:
-                vehicle.collided = True
-                vehicle.collision_time = self.time_step
+        for slot in collided_vehicles:
+            if not va.collided[slot]:
+                va.collided[slot] = True
+                va.collision_time[slot] = self.time_step
                 # Vehicles stop at their current intended position
                 # (they've already entered the intersection)
-                new_vehicles_state[vehicle]["vel"] = 0
+                new_vel[slot] = 0
         self.N_lateral += len(collided_vehicles) // 2
 
-        # if intersection_entrants[Road.R1] and intersection_entrants[Road.R2]:
-        #     if self.should_record_metrics():
-        #         self.N_lateral += 1
-
-        #     # Mark ALL vehicles entering the intersection as collided
-        #     # Vehicles remain at their intended positions (where they entered)
-        #     for road_entrants in intersection_entrants.values():
-        #         for vehicle in road_entrants:
-        #             if not vehicle.collided:
-        #                 vehicle.collided = True
-        #                 vehicle.collision_time = self.time_step
-        #                 # Vehicles stop at their current intended position
-        #                 # (they've already entered the intersection)
-        #                 new_vehicles_state[vehicle]["vel"] = 0
-
         # --- PHASE 3: Apply Final State and Update Grid ---
-        self.grid = {r: {l: [None] * self.L_TOTAL for l in Lane} for r in Road}
-
-        vehicles_to_remove = []
-
-        for vehicle in self.vehicles:
-            # Get the final state (which may have been modified by collision)
-            final_pos = new_vehicles_state[vehicle]["pos"]
-            final_vel = new_vehicles_state[vehicle]["vel"]
-
-            if vehicle.collided:
-                # Check if 50 steps have passed since collision
-                steps_since_collision = self.time_step - vehicle.collision_time
-                if steps_since_collision >= 5:
-                    vehicles_to_remove.append(vehicle)
-                else:
-                    # Keep vehicle in place - use final_pos which is the collision position
-                    vehicle.position = final_pos
-                    vehicle.velocity = final_vel
-                    self.grid[vehicle.road][vehicle.lane][final_pos] = vehicle
-
-            elif final_pos >= self.L_TOTAL:
-                # Vehicle successfully completed the road and leaves the system
-                travel_time = self.time_step - vehicle.entry_time
-                distance_traveled = self.L_TOTAL
-
-                # Update travel time metrics
-                if self.should_record_metrics():
-                    self.total_travel_time += travel_time
-                    self.total_distance_traveled += distance_traveled
-                    self.completed_vehicles += 1
-
-                vehicles_to_remove.append(vehicle)
-
-            else:
-                # Vehicle moves to new cell (normal movement)
-                vehicle.position = final_pos
-                vehicle.velocity = final_vel
-                self.grid[vehicle.road][vehicle.lane][final_pos] = vehicle
-
-                # Track throughput: count vehicles that exit the intersection
-                if (
-                    self.should_record_metrics()
-                    and not vehicle.exited_intersection
-                    and final_pos > self.intersection_end
-                ):
-                    self.throughput += 1
-                    vehicle.exited_intersection = True
-
-        # Remove vehicles that have left the road
-        for vehicle in vehicles_to_remove:
-            self.vehicles.remove(vehicle)
-
-            # remove vehicles from intersection entrants if they were marked
-            for road in intersection_entrants:
-                if vehicle in intersection_entrants[road]:
-                    intersection_entrants[road].remove(vehicle)
-
-        # Track velocities for average speed calculation
-        if self.should_record_metrics():
-            total_velocity_sum = 0
-            total_vehicle_count = 0
-            for vehicle in self.vehicles:
-                total_velocity_sum += vehicle.velocity
-                total_vehicle_count += 1
+        # Clear the cells the vehicles are leaving; the grid is updated in
+        # place instead of being rebuilt from scratch every step
+        self.grid[va.road[:n], va.lane[:n], va.position[:n]] = -1
+
+        # Outcome of every vehicle as boolean masks instead of per-slot branches:
+        # collided vehicles are cleared 5 steps after the collision, the others
+        # leave the system once they pass the end of the road
+        collided = va.collided[:n]
+        cleared = collided & (self.time_step - va.collision_time[:n] >= 5)
+        completed = ~collided & (new_pos >= self.L_TOTAL)
+        keep = ~(cleared | completed)
+
+        # Vehicles that stay take their final state (which may have been
+        # modified by collision; collided vehicles stay at the collision position)
+        va.position[:n][keep] = new_pos[keep]
+        va.velocity[:n][keep] = new_vel[keep]
+
+        total_travel_time = 0
+        completed_vehicles = 0
+        throughput = 0
+        if record:
+            # Update travel time metrics of the vehicles that completed the road
+            travel_times = self.time_step - va.entry_time[:n][completed]
+            total_travel_time = int(travel_times.sum())
+            completed_vehicles = int(np.count_nonzero(completed))
+
+            # Track throughput: count vehicles that exit the intersection
+            exited = va.exited_intersection[:n]
+            crossed = keep & ~collided & ~exited & (new_pos > self.intersection_end)
+            throughput = int(np.count_nonzero(crossed))
+            exited |= crossed
+
+        # Remove vehicles that have left the road (remaining slots keep their order)
+        if not keep.all():
+            va.compact(keep)
+
+        # Place the surviving vehicles in their new cells
+        n = va.n_active
+        self.grid[va.road[:n], va.lane[:n], va.position[:n]] = np.arange(n)
+        self._occupied = None
+
+        if record:
+            self.N_rear_end += n_rear_end
+            self.total_travel_time += total_travel_time
+            self.total_distance_traveled += completed_vehicles * self.L_TOTAL
+            self.completed_vehicles += completed_vehicles
+            self.throughput += throughput
+
+            # Track velocities for average speed calculation
+            total_velocity_sum = int(va.velocity[: va.n_active].sum())
+            total_vehicle_count = va.n_active
 
             avg_velocity = (
                 total_velocity_sum / total_vehicle_count
@@ -530,19 +689,168 @@ class IntersectionModel:
 
         self.time_step += 1
 
+    def _apply_nasch_rules_compiled(self):
+        """apply_nasch_rules() as a single call to the compiled nasch_step kernel."""
+        va = self.vehicle_array
+        record = self.should_record_metrics()
+
+        self._refill_draws()
+        light_red = np.array(self.traffic_light) == TrafficLightState.RED
+        (
+            va.n_active,
+            n_rear_end,
+            n_lateral,
+            completed,
+            travel_time,
+            throughput,
+            velocity_sum,
+        ) = nasch_step(
+            self.grid,
+            va.id,
+            va.road,
+            va.lane,
+            va.position,
+            va.velocity,
+            va.v_max,
+            va.p_red,
+            va.p_skid,
+            va.collided,
+            va.collision_time,
+            va.entry_time,
+            va.exited_intersection,
+            va.n_active,
+            light_red,
+            self._u_vehicle[self.time_step % RANDOM_BLOCK_STEPS],
+            self.P_B,
+            self.P_CHG,
+            self.intersection_start,
+            self.intersection_end,
+            self.time_step,
+            record,
+            model_kernels.PARALLEL_ROADS,
+            self._work_buffer(),
+            self._occupancy,
+        )
+
+        self._occupied = None
+
+        self.N_rear_end += n_rear_end
+        self.N_lateral += n_lateral
+        if record:
+            self.total_travel_time += int(travel_time)
+            self.total_distance_traveled += int(completed) * self.L_TOTAL
+            self.completed_vehicles += int(completed)
+            self.throughput += int(throughput)
+            self.avg_velocities += (
+                int(velocity_sum) / va.n_active if va.n_active > 0 else 0
+            )
+
+        self.time_step += 1
+
+    def _run_compiled(self, steps: int):
+        """
+        run_simulation()'s loop in the compiled run_steps kernel.
+
+        The kernel runs up to the end of the current block of random draws.
+        When the vehicle arrays or the draw block could fill up during a step,
+        that step runs here instead, which grows them, exactly as the
+        step-by-step loop would.
+        """
+        va = self.vehicle_array
+        stop = self.time_step + steps
+        totals = np.zeros(N_TOTALS, dtype=np.int64)
+        light = np.empty(len(Road), dtype=np.int8)
+
+        while self.time_step < stop:
+            self._refill_draws(len(ENTRY_LANES))
+            block_end = min(
+                stop, (self.time_step // RANDOM_BLOCK_STEPS + 1) * RANDOM_BLOCK_STEPS
+            )
+            light[:] = self.traffic_light
+            totals.fill(0)
+            (
+                va.n_active,
+                self.next_vehicle_id,
+                self.time_step,
+                self.avg_velocities,
+            ) = run_steps(
+                self.grid,
+                va.id,
+                va.road,
+                va.lane,
+                va.position,
+                va.velocity,
+                va.v_max,
+                va.p_red,
+                va.p_skid,
+                va.collided,
+                va.collision_time,
+                va.entry_time,
+                va.exited_intersection,
+                va.n_active,
+                self.next_vehicle_id,
+                light,
+                self._u_inject,
+                self._u_vehicle,
+                self.time_step,
+                block_end,
+                self.T_GREEN,
+                self.INJECTION_RATE,
+                self.V_MAX_BASE,
+                self.P_RED,
+                self.P_SKID,
+                self.P_B,
+                self.P_CHG,
+                self.intersection_start,
+                self.intersection_end,
+                self.metrics_start_step,
+                model_kernels.PARALLEL_ROADS,
+                self._work_buffer(),
+                self._occupancy,
+                totals,
+                float(self.avg_velocities),
+            )
+            self.traffic_light = [TrafficLightState(s) for s in light]
+            self.N_vehicles += int(totals[T_N_VEHICLES])
+            self.N_rear_end += int(totals[T_N_REAR_END])
+            self.N_lateral += int(totals[T_N_LATERAL])
+            self.total_travel_time += int(totals[T_TRAVEL_TIME])
+            self.completed_vehicles += int(totals[T_COMPLETED])
+            self.total_distance_traveled += int(totals[T_COMPLETED]) * self.L_TOTAL
+            self.throughput += int(totals[T_THROUGHPUT])
+            self._occupied = None
+
+            if self.time_step < block_end:
+                # Not enough free vehicle or draw slots for a full injection
+                self.update_traffic_light()
+                self.inject_vehicle()
+                self.apply_nasch_rules()
+
     def run_simulation(self, steps: int):
         """Runs the simulation for a number of steps."""
         self.steps = steps
 
         t1 = time.time()
-        for _ in range(steps):
-            self.update_traffic_light()
-            self.inject_vehicle()
-            self.apply_nasch_rules()
-
+        self.advance(steps)
         t2 = time.time()
         self.simulation_time = t2 - t1
 
+    def advance(self, steps: int = 1):
+        """
+        Advances the model by a number of time steps.
+
+        Unlike run_simulation() this does not touch the run bookkeeping
+        (steps, simulation_time), so it can be called repeatedly, e.g. by the
+        visualizer between frames.
+        """
+        if HAVE_NUMBA:
+            self._run_compiled(steps)
+        else:
+            for _ in range(steps):
+                self.update_traffic_light()
+                self.inject_vehicle()
+                self.apply_nasch_rules()
+
     def get_metrics(self):
         """Returns the output metrics of the simulation."""
         avg_travel_time = (
@@ -590,35 +898,38 @@ class IntersectionModel:
         )
         print(f"{'='*80}")
 
+        # Position markers are the same for every lane; build them once
+        marker_parts = []
+        for i in range(self.L_TOTAL):
+            if i == self.intersection_start:
+                marker_parts.append("| ")
+            marker_parts.append(f"{i%10} ")
+            if i == self.intersection_end - 1:
+                marker_parts.append("| ")
+        position_markers = "".join(marker_parts)
+
         for road in Road:
             print(f"\n--- Road {road.name} ---")
             for lane in Lane:
-                lane_state = ""
-                for i, cell in enumerate(self.grid[road][lane]):
+                parts = []
+                for i, cell in enumerate(self.grid[road, lane]):
                     # Mark intersection zone
                     if i == self.intersection_start:
-                        lane_state += "| "  # Start of intersection
+                        parts.append("| ")  # Start of intersection
 
-                    if cell is None:
-                        lane_state += ". "
+                    if cell == -1:
+                        parts.append(". ")
                     else:
-                        lane_state += (
-                            f"{cell.velocity} "
-                            if not cell.collided
-                            else f"X-{cell.velocity} "
+                        velocity = self.vehicle_array.velocity[cell]
+                        parts.append(
+                            f"{velocity} "
+                            if not self.vehicle_array.collided[cell]
+                            else f"X-{velocity} "
                         )
 
                     if i == self.intersection_end - 1:
-                        lane_state += "| "  # End of intersection
-
-                # Add position markers
-                position_markers = ""
-                for i in range(self.L_TOTAL):
-                    if i == self.intersection_start:
-                        position_markers += "| "
-                    position_markers += f"{i%10} "
-                    if i == self.intersection_end - 1:
-                        position_markers += "| "
+                        parts.append("| ")  # End of intersection
+                lane_state = "".join(parts)
 
                 print(f"Lane {lane.name:5}: {lane_state}")
                 if lane == Lane.RIGHT:  # Print markers only once per road
@@ -637,10 +948,11 @@ class IntersectionModel:
             for lane in Lane:
                 print(f"  Lane {lane.name}:")
                 for i in range(self.intersection_start, self.intersection_end):
-                    cell = self.grid[road][lane][i]
-                    if cell is None:
+                    cell = self.grid[road, lane, i]
+                    if cell == -1:
                         status = "Empty"
                     else:
-                        status = f"Vehicle {cell.id} (v={cell.velocity}) {'[COLLIDED]' if cell.collided else ''}"
+                        va = self.vehicle_array
+                        status = f"Vehicle {va.id[cell]} (v={va.velocity[cell]}) {'[COLLIDED]' if va.collided[cell] else ''}"
                     print(f"    Cell {i}: {status}")
         print("-----------------------------------------")
@@ -0,0 +1,1006 @@
+"""
+Compiled kernels for the per-step NaSch update.
+
+The kernels work directly on the NumPy arrays of a VehicleArray and are
+compiled to native code with numba. If numba cannot be imported (e.g. on a
+Python version it does not support yet) they run as plain Python functions
+with identical results, but far slower.
+"""
+
+import numpy as np
+
+from entities import TrafficLightState
+
+try:
+    from numba import njit, prange
+
+    HAVE_NUMBA = True
+except ImportError:  # Fallback only; numba is a required dependency
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Fallback decorator used when numba is not available."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Columns of the per-vehicle random draws (one uniform per decision per step)
+U_CHG = 0  # Lane change
+U_SKID = 1  # Braking failure
+U_RED = 2  # Red light violation
+U_BRAKE = 3  # Random braking
+N_VEHICLE_DRAWS = 4
+
+# Rows of the per-step int32 work buffer, shape (N_WORK_ROWS, capacity), that
+# the model allocates once and nasch_step reuses at every step
+W_GAP_VEHICLE = 0  # Empty cells to the vehicle ahead
+W_GAP_LIGHT = 1  # Empty cells to the red light stop line
+W_FRONT = 2  # Slot of the vehicle ahead
+W_GAP_VERSION = 3  # Lane change count at which the gaps were computed
+W_NEW_VEL = 4  # Intended velocity
+W_NEW_POS = 5  # Intended position
+N_WORK_ROWS = 6
+
+# Traffic light state of (R1, R2) by phase (time_step // t_green) % 2. Both
+# lights switch every t_green steps, the first time at step 0 (R1 starts green).
+LIGHT_PHASES = np.array(
+    [
+        [TrafficLightState.RED, TrafficLightState.GREEN],
+        [TrafficLightState.GREEN, TrafficLightState.RED],
+    ],
+    dtype=np.int8,
+)
+
+# Entries of the int64 metric totals accumulated by run_steps
+T_N_VEHICLES = 0
+T_N_REAR_END = 1
+T_N_LATERAL = 2
+T_TRAVEL_TIME = 3
+T_COMPLETED = 4
+T_THROUGHPUT = 5
+N_TOTALS = 6
+
+# nogil lets threads of a ThreadPoolExecutor run the kernels concurrently
+JIT_OPTIONS = dict(cache=True, fastmath=True, boundscheck=False, nogil=True)
+
+# Whether a simulation runs without holding the GIL. IntersectionModel
+# runs whole blocks of steps in the compiled run_steps kernel (nogil), and
+# only refills random draws in the interpreter between blocks, so threads of
+# one process run simulations concurrently and the dispatcher uses them by
+# default when numba is installed.
+STEP_RELEASES_GIL = True
+
+# Plan the velocities of the two roads on separate threads. Phase 1 only links
+# a vehicle to the one in front of it on the same road, so the roads are
+# independent and the result is the same. Off by default: the dispatcher
+# already runs one simulation per core, and a thread pool per simulation would
+# oversubscribe them. Read at every step, so it can be switched at runtime.
+PARALLEL_ROADS = False
+
+
+@njit(**JIT_OPTIONS)
+def plan_velocity(
+    i,
+    velocity,
+    v_max,
+    gap_vehicle,
+    gap_light,
+    front,
+    collided,
+    collision_time,
+    p_red,
+    p_skid,
+    p_b,
+    u,
+    far_gap,
+    time_step,
+    new_vel,
+):
+    """
+    Phase 1 for vehicle i (see step_velocities).
+
+    Returns:
+        1 if vehicle i rear-ended the vehicle in front, 0 otherwise
+    """
+    if collided[i]:
+        # If already collided, it doesn't move.
+        new_vel[i] = 0
+        return 0
+
+    gv = gap_vehicle[i]
+    gl = gap_light[i]
+
+    # --- Rule 1 (acceleration) ---
+    v_new = min(velocity[i] + 1, v_max[i])
+
+    # --- Rule 2 (safety distance) ---
+    can_advance_safely = v_new <= gv and v_new <= gl
+
+    if gv < gl and not can_advance_safely:
+        # Crash into the vehicle ahead with probability p_skid
+        j = front[i]
+        if j != -1 and u[i, U_SKID] < p_skid[i]:
+            collided[i] = True
+            collision_time[i] = time_step
+            collided[j] = True
+            collision_time[j] = time_step
+            # Both vehicles stay where they were
+            new_vel[i] = 0
+            new_vel[j] = 0
+            return 1
+        v_new = gv
+
+    elif gl < far_gap and not can_advance_safely:
+        # Ignore red light with probability p_red
+        if u[i, U_RED] >= p_red[i]:
+            v_new = gl
+
+    # Random braking
+    if v_new > 0 and u[i, U_BRAKE] < p_b:
+        v_new -= 1
+
+    new_vel[i] = v_new
+    return 0
+
+
+@njit(**JIT_OPTIONS)
+def step_velocities(
+    velocity,
+    v_max,
+    gap_vehicle,
+    gap_light,
+    front,
+    collided,
+    collision_time,
+    p_red,
+    p_skid,
+    p_b,
+    u,
+    far_gap,
+    time_step,
+    new_vel,
+):
+    """
+    Phase 1 of the NaSch update: computes the intended velocity of every vehicle.
+
+    Vehicles are processed in slot order because a braking failure also stops
+    (and marks as collided) the vehicle in front.
+
+    Args:
+        velocity, v_max, collided, collision_time, p_red, p_skid: VehicleArray columns
+        gap_vehicle: Empty cells to the vehicle ahead (far_gap if none)
+        gap_light: Empty cells to the red light stop line (far_gap if not relevant)
+        front: Slot of the vehicle ahead (-1 if none)
+        p_b: Random braking probability
+        u: Uniform draws for this step, shape (>= n, N_VEHICLE_DRAWS)
+        far_gap: Gap value meaning "nothing ahead"
+        time_step: Current time step (used as collision time)
+        new_vel: Output array for the intended velocities
+
+    Returns:
+        Number of rear-end collisions that happened in this step
+    """
+    n_rear_end = 0
+    for i in range(velocity.shape[0]):
+        n_rear_end += plan_velocity(
+            i,
+            velocity,
+            v_max,
+            gap_vehicle,
+            gap_light,
+            front,
+            collided,
+            collision_time,
+            p_red,
+            p_skid,
+            p_b,
+            u,
+            far_gap,
+            time_step,
+            new_vel,
+        )
+    return n_rear_end
+
+
+def step_velocities_vectorized(
+    velocity,
+    v_max,
+    gap_vehicle,
+    gap_light,
+    front,
+    collided,
+    collision_time,
+    p_red,
+    p_skid,
+    p_b,
+    u,
+    far_gap,
+    time_step,
+    new_vel,
+):
+    """
+    step_velocities() with NumPy array operations, for runs without numba.
+
+    The NaSch rules are applied to all vehicles at once. Only the braking
+    failures are then resolved one by one in slot order: a vehicle stopped by
+    an earlier failure cannot have one of its own. Same arguments and result
+    as step_velocities().
+    """
+    n = velocity.shape[0]
+    u = u[:n]
+    was_collided = collided.copy()
+
+    # --- Rule 1 (acceleration) ---
+    v_new = np.minimum(velocity + 1, v_max)
+
+    # --- Rule 2 (safety distance) ---
+    unsafe = (v_new > gap_vehicle) | (v_new > gap_light)
+    behind_vehicle = unsafe & (gap_vehicle < gap_light)
+    # Stop at the red light unless ignoring it (probability p_red)
+    at_red_light = (
+        unsafe & ~behind_vehicle & (gap_light < far_gap) & (u[:, U_RED] >= p_red)
+    )
+    v_new = np.where(behind_vehicle, gap_vehicle, v_new)
+    v_new = np.where(at_red_light, gap_light, v_new)
+
+    # Random braking
+    v_new -= (v_new > 0) & (u[:, U_BRAKE] < p_b)
+
+    # Crash into the vehicle ahead with probability p_skid
+    skids = behind_vehicle & ~was_collided & (front != -1) & (u[:, U_SKID] < p_skid)
+    n_rear_end = 0
+    for i in np.flatnonzero(skids):
+        if collided[i]:
+            continue  # Already stopped by the braking failure of an earlier slot
+        j = front[i]
+        n_rear_end += 1
+        collided[i] = True
+        collision_time[i] = time_step
+        collided[j] = True
+        collision_time[j] = time_step
+
+    # Collided vehicles (from before or from this step) stay where they were
+    new_vel[:] = np.where(collided, 0, v_new)
+    return n_rear_end
+
+
+@njit(**dict(JIT_OPTIONS, parallel=True))
+def step_velocities_by_road(
+    road,
+    n_roads,
+    velocity,
+    v_max,
+    gap_vehicle,
+    gap_light,
+    front,
+    collided,
+    collision_time,
+    p_red,
+    p_skid,
+    p_b,
+    u,
+    far_gap,
+    time_step,
+    new_vel,
+):
+    """
+    step_velocities() with the roads planned in parallel (one thread per road).
+
+    Within a road vehicles keep their slot order, so the result is identical
+    to step_velocities().
+    """
+    n_rear_end = 0
+    for r in prange(n_roads):
+        for i in range(velocity.shape[0]):
+            if road[i] == r:
+                n_rear_end += plan_velocity(
+                    i,
+                    velocity,
+                    v_max,
+                    gap_vehicle,
+                    gap_light,
+                    front,
+                    collided,
+                    collision_time,
+                    p_red,
+                    p_skid,
+                    p_b,
+                    u,
+                    far_gap,
+                    time_step,
+                    new_vel,
+                )
+    return n_rear_end
+
+
+@njit(**JIT_OPTIONS)
+def step_positions(position, new_vel, new_pos):
+    """Computes the intended position of every vehicle from its intended velocity."""
+    for i in range(position.shape[0]):
+        new_pos[i] = position[i] + new_vel[i]
+    return new_pos
+
+
+# Lane occupancy bitmasks: bit k of word w is set when cell 64 * w + k is occupied
+_ONE = np.uint64(1)
+_ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def occupancy_words(l_total):
+    """Number of uint64 words holding the occupancy bits of one lane."""
+    return (l_total + 63) // 64
+
+
+@njit(**JIT_OPTIONS)
+def fill_occupancy(occupancy, road, lane, position, n):
+    """Packs the cells of the first n vehicles into (road, lane, word) uint64 bitmasks."""
+    occupancy[:, :, :] = 0
+    for i in range(n):
+        set_occupied(occupancy, road[i], lane[i], position[i])
+
+
+@njit(**JIT_OPTIONS)
+def set_occupied(occupancy, road, lane, position):
+    occupancy[road, lane, position >> 6] |= _ONE << np.uint64(position & 63)
+
+
+@njit(**JIT_OPTIONS)
+def clear_occupied(occupancy, road, lane, position):
+    occupancy[road, lane, position >> 6] &= ~(_ONE << np.uint64(position & 63))
+
+
+@njit(**JIT_OPTIONS)
+def lowest_set_bit(x):
+    """Index of the lowest set bit of a non-zero uint64."""
+    k = 0
+    for shift in (32, 16, 8, 4, 2, 1):
+        low = (_ONE << np.uint64(shift)) - _ONE
+        if (x & low) == 0:
+            x >>= np.uint64(shift)
+            k += shift
+    return k
+
+
+@njit(**JIT_OPTIONS)
+def highest_set_bit(x):
+    """Index of the highest set bit of a non-zero uint64."""
+    k = 0
+    for shift in (32, 16, 8, 4, 2, 1):
+        if (x >> np.uint64(shift)) != 0:
+            x >>= np.uint64(shift)
+            k += shift
+    return k
+
+
+@njit(**JIT_OPTIONS)
+def next_occupied(occupancy, road, lane, start, stop):
+    """First occupied cell in [start, stop) of lane (road, lane), or -1 if there is none."""
+    words = occupancy[road, lane]
+    if start >= stop:
+        return -1
+    w = start >> 6
+    last = min((stop - 1) >> 6, words.shape[0] - 1)
+    if w > last:
+        return -1
+    m = words[w] & (_ALL << np.uint64(start & 63))
+    while m == 0:
+        w += 1
+        if w > last:
+            return -1
+        m = words[w]
+    k = (w << 6) + lowest_set_bit(m)
+    return k if k < stop else -1
+
+
+@njit(**JIT_OPTIONS)
+def prev_occupied(occupancy, road, lane, end):
+    """Last occupied cell <= end of lane (road, lane), or -1 if there is none."""
+    if end < 0:
+        return -1
+    words = occupancy[road, lane]
+    w = end >> 6
+    m = words[w] & (_ALL >> np.uint64(63 - (end & 63)))
+    while m == 0:
+        w -= 1
+        if w < 0:
+            return -1
+        m = words[w]
+    return (w << 6) + highest_set_bit(m)
+
+
+@njit(**JIT_OPTIONS)
+def front_gap(
+    grid, occupancy, road, lane, position, light_red, intersection_start, far_gap
+):
+    """
+    Looks ahead of `position` in lane (road, lane).
+
+    Returns:
+        (gap_vehicle, gap_light, front): empty cells to the vehicle ahead
+        (far_gap if none), empty cells to the red light stop line (far_gap if
+        the light is green or the stop line is behind), and the slot of the
+        vehicle ahead (-1 if none)
+
+    Only the gaps smaller than gap_light matter to the NaSch rules and the
+    lane change checks, so in front of a red light the search stops at the
+    stop line; a vehicle past it is reported as none (far_gap, -1).
+    """
+    gap_light = far_gap
+    stop = grid.shape[2]
+    if light_red[road] and position < intersection_start:
+        gap_light = intersection_start - position - 1
+        stop = intersection_start
+
+    gap_vehicle = far_gap
+    front = -1
+    k = next_occupied(occupancy, road, lane, position + 1, stop)
+    if k != -1:
+        gap_vehicle = k - position - 1
+        front = grid[road, lane, k]
+
+    return gap_vehicle, gap_light, front
+
+
+@njit(**JIT_OPTIONS)
+def back_gap(grid, occupancy, road, lane, position, far_gap):
+    """
+    Looks behind `position` in lane (road, lane).
+
+    Returns:
+        (gap, behind): empty cells to the vehicle behind (far_gap if none) and
+        its slot (-1 if none)
+    """
+    k = prev_occupied(occupancy, road, lane, position - 1)
+    if k != -1:
+        return position - k - 1, grid[road, lane, k]
+    return far_gap, -1
+
+
+@njit(**JIT_OPTIONS)
+def can_change_lane(
+    grid,
+    occupancy,
+    velocity,
+    road,
+    lane,
+    position,
+    current_gap,
+    light_red,
+    intersection_start,
+    far_gap,
+):
+    """
+    Checks if a lane change is safe and advantageous for a vehicle.
+
+    Safe: the cell next to the vehicle is free and the vehicle behind in the
+    other lane cannot reach it. Advantageous: the front gap (to a vehicle or
+    the red light) is larger in the other lane than `current_gap`, the one in
+    the current lane.
+    """
+    other_lane = 1 - lane
+    if grid[road, other_lane, position] != -1:
+        return False
+
+    gap, behind = back_gap(grid, occupancy, road, other_lane, position, far_gap)
+    if behind != -1 and velocity[behind] > gap:
+        return False
+
+    other_gv, other_gl, _ = front_gap(
+        grid,
+        occupancy,
+        road,
+        other_lane,
+        position,
+        light_red,
+        intersection_start,
+        far_gap,
+    )
+    return min(other_gv, other_gl) > current_gap
+
+
+@njit(**JIT_OPTIONS)
+def nasch_step(
+    grid,
+    vehicle_id,
+    road,
+    lane,
+    position,
+    velocity,
+    v_max,
+    p_red,
+    p_skid,
+    collided,
+    collision_time,
+    entry_time,
+    exited_intersection,
+    n,
+    light_red,
+    u,
+    p_b,
+    p_chg,
+    intersection_start,
+    intersection_end,
+    time_step,
+    record,
+    parallel_roads,
+    work,
+    occupancy,
+):
+    """
+    One full NaSch update of the first n vehicle slots, in place.
+
+    Runs the lane changes and Phases 1-3 of IntersectionModel.apply_nasch_rules,
+    removes the vehicles that left the road (keeping the order of the others)
+    and moves the remaining ones to their new grid cells. With parallel_roads
+    set, Phase 1 plans the roads on separate threads (see PARALLEL_ROADS).
+
+    `work` (int32, shape (N_WORK_ROWS, >= n)) and `occupancy` (uint64, shape
+    (roads, lanes, occupancy_words(L_TOTAL))) are scratch buffers owned by the
+    caller, so a step does not allocate.
+
+    Returns:
+        (n_active, n_rear_end, n_lateral, completed, travel_time, throughput,
+        velocity_sum): the new number of vehicles, the metric increments of
+        this step (rear-end collisions, completions, travel time and
+        throughput only counted when `record` is set) and the sum of the
+        velocities of the remaining vehicles
+    """
+    l_total = grid.shape[2]
+    far_gap = 2 * l_total
+
+    gap_vehicle = work[W_GAP_VEHICLE, :n]
+    gap_light = work[W_GAP_LIGHT, :n]
+    front = work[W_FRONT, :n]
+    gap_vehicle[:] = far_gap
+    gap_light[:] = far_gap
+    front[:] = -1
+    # Gap lookups find the next occupied cell a 64-cell word at a time
+    fill_occupancy(occupancy, road, lane, position, n)
+
+    # --- Lane changes (in slot order, each one sees the previous ones) ---
+    # The front gaps found here are reused by Phase 1 unless a later lane
+    # change on the same road may have changed them; n_changes[r] counts the
+    # lane changes on road r and gap_version[i] is its value when the gaps of
+    # vehicle i were computed.
+    n_changes = np.zeros(grid.shape[0], dtype=np.int64)
+    gap_version = work[W_GAP_VERSION, :n]
+    gap_version[:] = -1
+    for i in range(n):
+        if collided[i]:
+            continue
+        r = road[i]
+        l = lane[i]
+        p = position[i]
+        gv, gl, f = front_gap(
+            grid, occupancy, r, l, p, light_red, intersection_start, far_gap
+        )
+        gap_vehicle[i] = gv
+        gap_light[i] = gl
+        front[i] = f
+        gap_version[i] = n_changes[r]
+        # Only consider lane change if blocked by a vehicle
+        if gv >= gl:
+            continue
+        if (
+            can_change_lane(
+                grid,
+                occupancy,
+                velocity,
+                r,
+                l,
+                p,
+                min(gv, gl),
+                light_red,
+                intersection_start,
+                far_gap,
+            )
+            and u[i, U_CHG] < p_chg
+        ):
+            grid[r, l, p] = -1
+            clear_occupied(occupancy, r, l, p)
+            lane[i] = 1 - l
+            grid[r, 1 - l, p] = i
+            set_occupied(occupancy, r, 1 - l, p)
+            n_changes[r] += 1
+            gap_version[i] = -1
+
+    # --- PHASE 1: Calculate intended moves for all vehicles ---
+    for i in range(n):
+        if not collided[i] and gap_version[i] != n_changes[road[i]]:
+            gap_vehicle[i], gap_light[i], front[i] = front_gap(
+                grid,
+                occupancy,
+                road[i],
+                lane[i],
+                position[i],
+                light_red,
+                intersection_start,
+                far_gap,
+            )
+
+    new_vel = work[W_NEW_VEL, :n]
+    if parallel_roads:
+        n_rear_end = step_velocities_by_road(
+            road[:n],
+            grid.shape[0],
+            velocity[:n],
+            v_max[:n],
+            gap_vehicle,
+            gap_light,
+            front,
+            collided[:n],
+            collision_time[:n],
+            p_red[:n],
+            p_skid[:n],
+            p_b,
+            u,
+            far_gap,
+            time_step,
+            new_vel,
+        )
+    else:
+        n_rear_end = step_velocities(
+            velocity[:n],
+            v_max[:n],
+            gap_vehicle,
+            gap_light,
+            front,
+            collided[:n],
+            collision_time[:n],
+            p_red[:n],
+            p_skid[:n],
+            p_b,
+            u,
+            far_gap,
+            time_step,
+            new_vel,
+        )
+    if not record:
+        n_rear_end = 0
+    new_pos = step_positions(position[:n], new_vel, work[W_NEW_POS, :n])
+
+    # --- PHASE 2: Check for Lateral Collisions ---
+    # The four cells where the lanes of R1 (road 0) and R2 (road 1) cross:
+    # (R1 lane, R1 cell offset, R2 lane, R2 cell offset), with LEFT = 0, RIGHT = 1
+    n_lateral = 0
+    for site in range(4):
+        if site == 0:
+            a = grid[0, 0, intersection_start]
+            b = grid[1, 1, intersection_start]
+        elif site == 1:
+            a = grid[0, 0, intersection_start + 1]
+            b = grid[1, 0, intersection_start]
+        elif site == 2:
+            a = grid[0, 1, intersection_start]
+            b = grid[1, 1, intersection_start + 1]
+        else:
+            a = grid[0, 1, intersection_start + 1]
+            b = grid[1, 0, intersection_start + 1]
+        if a == -1 or b == -1:
+            continue
+        n_lateral += 1
+        for j in (a, b):
+            if not collided[j]:
+                collided[j] = True
+                collision_time[j] = time_step
+                # Vehicles stop at their current intended position
+                new_vel[j] = 0
+
+    # --- PHASE 3: Apply final state, drop departed vehicles, update grid ---
+    # Clear the cells the vehicles are leaving instead of refilling the grid
+    for i in range(n):
+        grid[road[i], lane[i], position[i]] = -1
+
+    completed = 0
+    travel_time = 0
+    throughput = 0
+    n_active = 0
+    for i in range(n):
+        if collided[i]:
+            # Collided vehicles are removed 5 steps after the collision
+            if time_step - collision_time[i] >= 5:
+                continue
+        elif new_pos[i] >= l_total:
+            # Vehicle successfully completed the road and leaves the system
+            if record:
+                travel_time += time_step - entry_time[i]
+                completed += 1
+            continue
+        elif (
+            record and not exited_intersection[i] and new_pos[i] > intersection_end
+        ):
+            # Track throughput: count vehicles that exit the intersection
+            throughput += 1
+            exited_intersection[i] = True
+
+        # Keep the vehicle, shifted down to the next free slot
+        j = n_active
+        vehicle_id[j] = vehicle_id[i]
+        road[j] = road[i]
+        lane[j] = lane[i]
+        position[j] = new_pos[i]
+        velocity[j] = new_vel[i]
+        v_max[j] = v_max[i]
+        p_red[j] = p_red[i]
+        p_skid[j] = p_skid[i]
+        collided[j] = collided[i]
+        collision_time[j] = collision_time[i]
+        entry_time[j] = entry_time[i]
+        exited_intersection[j] = exited_intersection[i]
+        n_active += 1
+
+    velocity_sum = 0
+    for j in range(n_active):
+        grid[road[j], lane[j], position[j]] = j
+        velocity_sum += velocity[j]
+
+    return (
+        n_active,
+        n_rear_end,
+        n_lateral,
+        completed,
+        travel_time,
+        throughput,
+        velocity_sum,
+    )
+
+
+@njit(**JIT_OPTIONS)
+def run_steps(
+    grid,
+    vehicle_id,
+    road,
+    lane,
+    position,
+    velocity,
+    v_max,
+    p_red,
+    p_skid,
+    collided,
+    collision_time,
+    entry_time,
+    exited_intersection,
+    n,
+    next_vehicle_id,
+    light,
+    u_inject,
+    u_vehicle,
+    time_step,
+    stop_step,
+    t_green,
+    injection_rate,
+    vmax_base,
+    p_red_base,
+    p_skid_base,
+    p_b,
+    p_chg,
+    intersection_start,
+    intersection_end,
+    metrics_start_step,
+    parallel_roads,
+    work,
+    occupancy,
+    totals,
+    avg_velocities,
+):
+    """
+    Runs whole simulation steps (traffic light, injection, NaSch update) in place.
+
+    This is IntersectionModel.run_simulation's loop with the run parameters
+    passed in as scalars, so they stay in registers for the whole block
+    instead of being read from the model at every step.
+
+    Stops at stop_step, or before a step that could need more vehicle slots
+    or per-vehicle draws than are left (the caller grows the arrays or the
+    draw block and takes that step itself). The caller also keeps stop_step
+    within the current block of random draws.
+
+    Args:
+        light: Traffic light state per road (TrafficLightState values), updated
+        u_inject: Injection draws of the block, shape (RANDOM_BLOCK_STEPS, roads * lanes)
+        u_vehicle: Vehicle draws of the block, shape (RANDOM_BLOCK_STEPS, draw slots, N_VEHICLE_DRAWS)
+        totals: Metric totals (T_* entries), incremented
+        avg_velocities: Running sum of the per-step average velocities
+
+    Returns:
+        (n_active, next_vehicle_id, time_step, avg_velocities) after the last step
+    """
+    block_steps = u_inject.shape[0]
+    n_lanes = grid.shape[1]
+    n_entries = u_inject.shape[1]
+    # Slots that can take a vehicle: the arrays and the draws must cover them
+    capacity = min(vehicle_id.shape[0], u_vehicle.shape[1])
+    # The draws are float32; compare in float32 like the Python injection
+    rate = np.float32(injection_rate)
+    light_red = np.empty(light.shape[0], dtype=np.bool_)
+
+    while time_step < stop_step and n + n_entries <= capacity:
+        # Traffic light: looked up from the phase of the cycle
+        light[:] = LIGHT_PHASES[(time_step // t_green) & 1]
+
+        record = time_step >= metrics_start_step
+
+        # Injection: each entry lane independently, if its first cell is free
+        u = u_inject[time_step % block_steps]
+        for k in range(n_entries):
+            r = k // n_lanes
+            l = k % n_lanes
+            if u[k] > rate or grid[r, l, 0] != -1:
+                continue
+            vehicle_id[n] = next_vehicle_id
+            road[n] = r
+            lane[n] = l
+            position[n] = 0
+            velocity[n] = 0
+            v_max[n] = vmax_base
+            p_red[n] = p_red_base
+            p_skid[n] = p_skid_base
+            collided[n] = False
+            collision_time[n] = -1
+            entry_time[n] = time_step
+            exited_intersection[n] = False
+            grid[r, l, 0] = n
+            n += 1
+            next_vehicle_id += 1
+            if record:
+                totals[T_N_VEHICLES] += 1
+
+        for r in range(light.shape[0]):
+            light_red[r] = light[r] == TrafficLightState.RED
+        (
+            n,
+            n_rear_end,
+            n_lateral,
+            completed,
+            travel_time,
+            throughput,
+            velocity_sum,
+        ) = nasch_step(
+            grid,
+            vehicle_id,
+            road,
+            lane,
+            position,
+            velocity,
+            v_max,
+            p_red,
+            p_skid,
+            collided,
+            collision_time,
+            entry_time,
+            exited_intersection,
+            n,
+            light_red,
+            u_vehicle[time_step % block_steps],
+            p_b,
+            p_chg,
+            intersection_start,
+            intersection_end,
+            time_step,
+            record,
+            parallel_roads,
+            work,
+            occupancy,
+        )
+        totals[T_N_REAR_END] += n_rear_end
+        totals[T_N_LATERAL] += n_lateral
+        if record:
+            totals[T_TRAVEL_TIME] += travel_time
+            totals[T_COMPLETED] += completed
+            totals[T_THROUGHPUT] += throughput
+            avg_velocities += velocity_sum / n if n > 0 else 0
+
+        time_step += 1
+
+    return n, next_vehicle_id, time_step, avg_velocities
+
+
+def warm_jit():
+    """
+    Compiles the kernels (or loads them from numba's on-disk cache).
+
+    Call once per process before running simulations, e.g. from a worker pool
+    initializer, so the first simulation does not pay the compilation cost.
+    Does nothing when numba is not installed.
+    """
+    if not HAVE_NUMBA:
+        return
+
+    velocity = np.zeros(1, dtype=np.int32)
+    gaps = np.zeros(1, dtype=np.int32)
+    front = np.full(1, -1, dtype=np.int32)
+    collided = np.zeros(1, dtype=np.bool_)
+    collision_time = np.full(1, -1, dtype=np.int64)
+    probabilities = np.zeros(1, dtype=np.float64)
+    u = np.ones((1, N_VEHICLE_DRAWS), dtype=np.float32)
+    new_vel = np.empty(1, dtype=np.int32)
+
+    step_velocities(
+        velocity,
+        velocity,
+        gaps,
+        gaps,
+        front,
+        collided,
+        collision_time,
+        probabilities,
+        probabilities,
+        0.0,
+        u,
+        1,
+        0,
+        new_vel,
+    )
+    step_positions(velocity, new_vel, np.empty(1, dtype=np.int32))
+
+    grid = np.full((2, 2, 4), -1, dtype=np.int32)
+    small = np.zeros(1, dtype=np.int8)
+    vehicle_id = np.zeros(1, dtype=np.int64)
+    light_red = np.zeros(2, dtype=np.bool_)
+    nasch_step(
+        grid,
+        vehicle_id,
+        small,
+        small,
+        velocity,
+        velocity,
+        velocity,
+        probabilities,
+        probabilities,
+        collided,
+        collision_time,
+        collision_time,
+        collided,
+        0,
+        light_red,
+        u,
+        0.0,
+        0.0,
+        1,
+        3,
+        0,
+        False,
+        False,
+        np.empty((N_WORK_ROWS, 1), dtype=np.int32),
+        np.zeros((2, 2, occupancy_words(4)), dtype=np.uint64),
+    )
+
+    run_steps(
+        grid,
+        vehicle_id,
+        small,
+        small,
+        velocity,
+        velocity,
+        velocity,
+        probabilities,
+        probabilities,
+        collided,
+        collision_time,
+        collision_time,
+        collided,
+        0,
+        0,
+        np.zeros(2, dtype=np.int8),
+        np.ones((1, 4), dtype=np.float32),
+        np.ones((1, 1, N_VEHICLE_DRAWS), dtype=np.float32),
+        0,
+        0,
+        1,
+        0.0,
+        1,
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+        1,
+        3,
+        0,
+        False,
+        np.empty((N_WORK_ROWS, 1), dtype=np.int32),
+        np.zeros((2, 2, occupancy_words(4)), dtype=np.uint64),
+        np.zeros(N_TOTALS, dtype=np.int64),
+        0.0,
+    )
@@ -1,10 +1,93 @@
+import functools
+import subprocess
+
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import numpy as np
+from matplotlib.collections import EllipseCollection, LineCollection
+from matplotlib.colors import to_rgba_array
 from matplotlib.patches import Rectangle
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from model import IntersectionModel
 from entities import Road, Lane, TrafficLightState
 
+# Statistics box layout, filled in with str.format every frame
+INFO_TEXT_TEMPLATE = (
+    "Time: {time_step}\n"
+    "Vehicles: {n_active}\n"
+    "Total Vehicles: {n_vehicles}\n"
+    "Completed: {completed}\n"
+    "Lateral Collisions: {n_lateral}\n"
+    "Rear-end Collisions: {n_rear_end}\n"
+    "Avg Travel Time: {avg_travel_time:.2f} steps\n"
+    "Avg Speed: {avg_speed:.2f} cells/step"
+)
+
+# GIFs are encoded by Pillow on a single core; they are rendered at most at
+# this resolution
+GIF_MAX_DPI = 72
+
+# Hardware H.264 encoders tried for MP4 output, before falling back to libx264
+HARDWARE_ENCODERS = ("h264_nvenc", "h264_videotoolbox")
+
+
+@functools.lru_cache(maxsize=None)
+def pick_video_encoder() -> Tuple[str, Tuple[str, ...]]:
+    """
+    Chooses the ffmpeg encoder for MP4 output (probed once per process).
+
+    A hardware encoder is used when ffmpeg can open it on a short test clip
+    (being listed by `ffmpeg -encoders` only means it was compiled in);
+    otherwise libx264 with its fastest preset.
+
+    Returns:
+        (codec, extra ffmpeg arguments)
+    """
+    ffmpeg = animation.FFMpegWriter.bin_path()
+    for codec in HARDWARE_ENCODERS:
+        probe = [
+            ffmpeg,
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "color=size=256x256:duration=0.1",
+            "-c:v",
+            codec,
+            "-f",
+            "null",
+            "-",
+        ]
+        try:
+            if subprocess.run(probe, capture_output=True, timeout=10).returncode == 0:
+                return codec, ()
+        except (OSError, subprocess.TimeoutExpired):
+            break  # ffmpeg itself is unusable; let the writer report it
+    return "libx264", ("-preset", "ultrafast", "-tune", "animation")
+
+
+def record_metrics(
+    model: IntersectionModel, frames: int = 500, render_every: int = 1
+) -> List[dict]:
+    """
+    Headless counterpart of an animation: steps the model frame by frame
+    without creating any figure or artist.
+
+    Args:
+        model: Model to step
+        frames: Number of frames to run
+        render_every: Simulation steps per frame
+
+    Returns:
+        The model's get_metrics() after each frame
+    """
+    metrics = []
+    for _ in range(frames):
+        model.advance(render_every)
+        metrics.append(model.get_metrics())
+    return metrics
+
 
 class TrafficSimulationVisualizer:
     """
@@ -12,10 +95,18 @@ class TrafficSimulationVisualizer:
 
     Road R1 (vertical): North-South direction
     Road R2 (horizontal): West-East direction
-    Cars are shown as black cells in their respective lanes.
+    Cars are shown as circles in their lanes, each in a color of its own
+    (red once collided).
     """
 
-    def __init__(self, model: IntersectionModel, interval: int = 100, dpi: int = 150):
+    def __init__(
+        self,
+        model: IntersectionModel,
+        interval: int = 100,
+        dpi: int = 150,
+        render_every: int = 1,
+        show_velocities: bool = True,
+    ):
         """
         Initialize the visualizer.
 
@@ -23,10 +114,14 @@ class TrafficSimulationVisualizer:
             model: IntersectionModel instance to visualize
             interval: Animation interval in milliseconds (time between frames)
             dpi: Dots per inch for the figure (higher = better resolution)
+            render_every: Simulation steps per animation frame (1 = draw every step)
+            show_velocities: Label each vehicle with its velocity
         """
         self.model = model
         self.interval = interval
         self.dpi = dpi
+        self.render_every = render_every
+        self.show_velocities = show_velocities
 
         # Calculate scaling factor based on DPI (baseline is 100 DPI)
         self.scale = dpi / 100.0
@@ -39,10 +134,23 @@ class TrafficSimulationVisualizer:
         self.intersection_start = model.intersection_start
         self.intersection_end = model.intersection_end
 
+        # Velocity label strings; velocities never exceed the model's vmax
+        self._velocity_strings = tuple(str(v) for v in range(model.V_MAX_BASE + 1))
+
         # Visual settings that scale with DPI
         self.cell_size = 3.0 * self.scale  # Size of each cell (car size)
         self.lane_width = 4.0 * self.scale  # Width of each lane
 
+        # Coordinate across the road of every (road, lane), as a lookup table:
+        # R1 lanes are ordered left to right, R2 lanes top to bottom
+        center = self.L_TOTAL / 2
+        half_width = self.lane_width / 2
+        self._lane_center = np.empty((len(Road), len(Lane)))
+        self._lane_center[Road.R1, Lane.LEFT] = center - half_width
+        self._lane_center[Road.R1, Lane.RIGHT] = center + half_width
+        self._lane_center[Road.R2, Lane.LEFT] = center + half_width
+        self._lane_center[Road.R2, Lane.RIGHT] = center - half_width
+
         # Color cycling for vehicles
         self.vehicle_colors = [
             "#FF6B6B",  # Red
@@ -56,11 +164,22 @@ class TrafficSimulationVisualizer:
             "#F8B739",  # Orange
             "#52B788",  # Green
         ]
-        self.color_index = 0
-        self.vehicle_color_map = {}  # Maps vehicle id to color
+        # RGBA palette indexed by vehicle id, so a vehicle keeps its color
+        # for its whole trip without a per-vehicle lookup table
+        self._palette = to_rgba_array(self.vehicle_colors)
+        self._collided_face, self._collided_edge, self._edge = to_rgba_array(
+            ["red", "darkred", "black"]
+        )
 
-        # Set up the plot
+        # Set up the plot; the static scenery (axes, roads, stop lines) is
+        # drawn once, frames only update the dynamic artists below
         self._setup_plot()
+        self._draw_roads()
+        self._create_traffic_lights()
+        self._create_info_text()
+        self._create_vehicle_collection()
+        self._vehicle_labels = []  # Pool of velocity labels, reused across frames
+        self._n_labels = 0  # Labels of the pool shown in the last frame
 
     def _setup_plot(self):
         """Set up the plot with grid and labels."""
@@ -82,10 +201,11 @@ class TrafficSimulationVisualizer:
         )
 
     def _get_road_coordinates(
-        self, road: Road, lane: Lane, position: int
-    ) -> Tuple[float, float]:
+        self, road: np.ndarray, lane: np.ndarray, position: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Convert road position to (x, y) coordinates on the plot.
+        Convert road positions to (x, y) coordinates on the plot, for arrays
+        of vehicles at once.
 
         Road R1 (vertical):
             - LEFT lane: x = center - lane_width/2
@@ -97,40 +217,30 @@ class TrafficSimulationVisualizer:
             - RIGHT lane: y = center - lane_width/2
             - x = position (from left to right)
         """
-        center = self.L_TOTAL / 2
-
-        if road == Road.R1:  # Vertical road (North-South)
-            if lane == Lane.LEFT:
-                x = center - self.lane_width / 2
-            else:  # RIGHT
-                x = center + self.lane_width / 2
-            y = position
-        else:  # Road.R2 - Horizontal road (West-East)
-            if lane == Lane.LEFT:
-                y = center + self.lane_width / 2
-            else:  # RIGHT
-                y = center - self.lane_width / 2
-            x = position
+        on_r1 = road == Road.R1  # Vertical road (North-South)
+        across = self._lane_center[road, lane]
 
+        x = np.where(on_r1, across, position)
+        y = np.where(on_r1, position, across)
         return x, y
 
     def _draw_roads(self):
         """Draw the road infrastructure (lanes and intersection)."""
         center = self.L_TOTAL / 2
 
-        # Draw Road R1 (vertical) - two lanes with scaled line width
+        # Draw both roads - two lanes each, as one collection with scaled line width
+        lane_lines = []
         for lane_offset in [-self.lane_width / 2, self.lane_width / 2]:
-            x = center + lane_offset
-            self.ax.plot(
-                [x, x], [0, self.L_TOTAL], "k-", linewidth=4 * self.scale, alpha=0.5
-            )
-
-        # Draw Road R2 (horizontal) - two lanes with scaled line width
-        for lane_offset in [-self.lane_width / 2, self.lane_width / 2]:
-            y = center + lane_offset
-            self.ax.plot(
-                [0, self.L_TOTAL], [y, y], "k-", linewidth=4 * self.scale, alpha=0.5
-            )
+            across = center + lane_offset
+            # Road R1 (vertical) and Road R2 (horizontal)
+            lane_lines.append([(across, 0), (across, self.L_TOTAL)])
+            lane_lines.append([(0, across), (self.L_TOTAL, across)])
+        self.ax.add_collection(
+            LineCollection(
+                lane_lines, colors="k", linewidths=4 * self.scale, alpha=0.5
+            ),
+            autolim=False,
+        )
 
         # Highlight intersection zone (adjusted for wider lanes)
         intersection_rect = Rectangle(
@@ -150,41 +260,41 @@ class TrafficSimulationVisualizer:
 
         # Draw stop lines with scaled width
         stop_line_pos = self.intersection_start - 0.5
-        # R1 stop line (horizontal line before intersection)
-        self.ax.plot(
-            [center - self.lane_width, center + self.lane_width],
-            [stop_line_pos, stop_line_pos],
-            "r--",
-            linewidth=3 * self.scale,
-            alpha=0.7,
-        )
-        # R2 stop line (vertical line before intersection)
-        self.ax.plot(
-            [stop_line_pos, stop_line_pos],
-            [center - self.lane_width, center + self.lane_width],
-            "r--",
-            linewidth=3 * self.scale,
-            alpha=0.7,
+        stop_lines = [
+            # R1 stop line (horizontal line before intersection)
+            [
+                (center - self.lane_width, stop_line_pos),
+                (center + self.lane_width, stop_line_pos),
+            ],
+            # R2 stop line (vertical line before intersection)
+            [
+                (stop_line_pos, center - self.lane_width),
+                (stop_line_pos, center + self.lane_width),
+            ],
+        ]
+        self.ax.add_collection(
+            LineCollection(
+                stop_lines,
+                colors="r",
+                linestyles="--",
+                linewidths=3 * self.scale,
+                alpha=0.7,
+            ),
+            autolim=False,
         )
 
-    def _draw_traffic_lights(self):
-        """Draw traffic light indicators."""
+    def _create_traffic_lights(self):
+        """Create the traffic light indicators (colored by _draw_traffic_lights)."""
         center = self.L_TOTAL / 2
         offset = 5 * self.scale
 
         # Traffic light for R1 (vertical road) - scaled size
-        r1_color = (
-            "green"
-            if self.model.traffic_light[Road.R1] == TrafficLightState.GREEN
-            else "red"
-        )
-        r1_light = plt.Circle(
+        self._r1_light = plt.Circle(
             (center + offset, self.intersection_start - 3 * self.scale),
             1.5 * self.scale,
-            color=r1_color,
             zorder=10,
         )
-        self.ax.add_patch(r1_light)
+        self.ax.add_patch(self._r1_light)
         self.ax.text(
             center + offset,
             self.intersection_start - 6 * self.scale,
@@ -196,18 +306,12 @@ class TrafficSimulationVisualizer:
         )
 
         # Traffic light for R2 (horizontal road) - scaled size
-        r2_color = (
-            "green"
-            if self.model.traffic_light[Road.R2] == TrafficLightState.GREEN
-            else "red"
-        )
-        r2_light = plt.Circle(
+        self._r2_light = plt.Circle(
             (self.intersection_start - 3 * self.scale, center + offset),
             1.5 * self.scale,
-            color=r2_color,
             zorder=10,
         )
-        self.ax.add_patch(r2_light)
+        self.ax.add_patch(self._r2_light)
         self.ax.text(
             self.intersection_start - 6 * self.scale,
             center + offset,
@@ -217,52 +321,101 @@ class TrafficSimulationVisualizer:
             fontsize=int(14 * self.scale),
             fontweight="bold",
         )
+        self._draw_traffic_lights()
 
-    def _draw_vehicles(self):
-        """Draw all vehicles as larger circles with unique colors."""
-        for vehicle in self.model.vehicles:
-            x, y = self._get_road_coordinates(
-                vehicle.road, vehicle.lane, vehicle.position
+    def _draw_traffic_lights(self):
+        """Color the traffic light indicators with the current light state."""
+        for road, light in ((Road.R1, self._r1_light), (Road.R2, self._r2_light)):
+            light.set_color(
+                "green"
+                if self.model.traffic_light[road] == TrafficLightState.GREEN
+                else "red"
             )
 
-            # Assign color to new vehicles
-            if id(vehicle) not in self.vehicle_color_map:
-                self.vehicle_color_map[id(vehicle)] = self.vehicle_colors[
-                    self.color_index
-                ]
-                self.color_index = (self.color_index + 1) % len(self.vehicle_colors)
-
-            # Color: red for collided vehicles, assigned color for normal
-            if vehicle.collided:
-                color = "red"
-                edge_color = "darkred"
-            else:
-                color = self.vehicle_color_map[id(vehicle)]
-                edge_color = "black"
-
-            # Draw vehicle as a scaled circle with visible border
-            vehicle_circle = plt.Circle(
-                (x, y),
-                self.cell_size / 2,
-                facecolor=color,
-                edgecolor=edge_color,
-                linewidth=0.5 * self.scale,
-                zorder=5,
-            )
-            self.ax.add_patch(vehicle_circle)
-
-            # Always show velocity as text inside the circle with scaled font
-            self.ax.text(
-                x,
-                y,
-                str(vehicle.velocity),
-                ha="center",
-                va="center",
-                fontsize=int(14 * self.scale),
-                color="white",
-                fontweight="bold",
-                zorder=6,
+    def _create_vehicle_collection(self):
+        """Create the single collection holding every vehicle circle."""
+        # Diameters in data units, so circles keep their size in cells
+        self._vehicle_collection = EllipseCollection(
+            self.cell_size,
+            self.cell_size,
+            0,
+            units="xy",
+            offsets=np.empty((0, 2)),
+            offset_transform=self.ax.transData,
+            linewidth=0.5 * self.scale,
+            zorder=5,
+        )
+        self.ax.add_collection(self._vehicle_collection, autolim=False)
+
+    def _vehicle_label_pool(self, n: int) -> List:
+        """Returns the velocity label pool, grown (by doubling) to at least n labels."""
+        pool = self._vehicle_labels
+        if n <= len(pool):
+            return pool
+        for _ in range(max(n, 2 * len(pool)) - len(pool)):
+            pool.append(
+                self.ax.text(
+                    0,
+                    0,
+                    "",
+                    ha="center",
+                    va="center",
+                    fontsize=int(14 * self.scale),
+                    color="white",
+                    fontweight="bold",
+                    zorder=6,
+                    visible=False,
+                )
             )
+        return pool
+
+    def _draw_vehicles(self):
+        """Draw all vehicles as larger circles with unique colors."""
+        va = self.model.vehicle_array
+        n = va.n_active
+        x, y = self._get_road_coordinates(
+            va.road[:n], va.lane[:n], va.position[:n]
+        )
+
+        # Color: red for collided vehicles, palette color by id for normal
+        collided = va.collided[:n, np.newaxis]
+        face_colors = np.where(
+            collided,
+            self._collided_face,
+            self._palette[va.id[:n] % len(self._palette)],
+        )
+        edge_colors = np.where(collided, self._collided_edge, self._edge)
+
+        # Show velocity as text inside the circle, reusing the labels of
+        # earlier frames and hiding the ones left over
+        n_labels = n if self.show_velocities else 0
+        labels = self._vehicle_label_pool(n_labels)
+        for label, label_x, label_y, velocity in zip(
+            labels, x, y, va.velocity[:n_labels]
+        ):
+            label.set_position((label_x, label_y))
+            label.set_text(self._velocity_strings[velocity])
+            label.set_visible(True)
+        for label in labels[n_labels : self._n_labels]:
+            label.set_visible(False)
+        self._n_labels = n_labels
+
+        # Move all circles at once instead of creating one patch per vehicle
+        self._vehicle_collection.set_offsets(np.column_stack((x, y)))
+        self._vehicle_collection.set_facecolor(face_colors)
+        self._vehicle_collection.set_edgecolor(edge_colors)
+
+    def _create_info_text(self):
+        """Create the statistics box (filled in by _draw_info_text)."""
+        self._info_text = self.ax.text(
+            0.02,
+            0.98,
+            "",
+            transform=self.ax.transAxes,
+            fontsize=int(10 * self.scale),
+            verticalalignment="top",
+            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
+        )
 
     def _draw_info_text(self):
         """Draw simulation statistics."""
@@ -272,50 +425,50 @@ class TrafficSimulationVisualizer:
             if self.model.completed_vehicles > 0
             else 0
         )
-        avg_speed = (
-            self.model.avg_velocities / len(self.model.vehicles)
-            if len(self.model.vehicles) > 0
-            else 0
+        n_active = self.model.vehicle_array.n_active
+        avg_speed = self.model.avg_velocities / n_active if n_active > 0 else 0
+
+        self._info_text.set_text(
+            INFO_TEXT_TEMPLATE.format(
+                time_step=self.model.time_step,
+                n_active=n_active,
+                n_vehicles=self.model.N_vehicles,
+                completed=self.model.completed_vehicles,
+                n_lateral=self.model.N_lateral,
+                n_rear_end=self.model.N_rear_end,
+                avg_travel_time=avg_travel_time,
+                avg_speed=avg_speed,
+            )
         )
 
-        info_text = (
-            f"Time: {self.model.time_step}\n"
-            f"Vehicles: {len(self.model.vehicles)}\n"
-            f"Total Vehicles: {self.model.N_vehicles}\n"
-            f"Completed: {self.model.completed_vehicles}\n"
-            f"Lateral Collisions: {self.model.N_lateral}\n"
-            f"Rear-end Collisions: {self.model.N_rear_end}\n"
-            f"Avg Travel Time: {avg_travel_time:.2f} steps\n"
-            f"Avg Speed: {avg_speed:.2f} cells/step"
-        )
-        self.ax.text(
-            0.02,
-            0.98,
-            info_text,
-            transform=self.ax.transAxes,
-            fontsize=int(10 * self.scale),
-            verticalalignment="top",
-            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
+    def _dynamic_artists(self) -> Tuple:
+        """Artists that change between frames (redrawn when blitting)."""
+        return (
+            self._r1_light,
+            self._r2_light,
+            self._info_text,
+            self._vehicle_collection,
+            *self._vehicle_labels[: self._n_labels],
         )
 
+    def _init_frame(self):
+        """Initial frame for the animation: draws the model without stepping it."""
+        self._draw_traffic_lights()
+        self._draw_vehicles()
+        self._draw_info_text()
+        return self._dynamic_artists()
+
     def _update_frame(self, frame):
         """Update function for animation - called for each frame."""
-        # Clear the axis
-        self.ax.clear()
-        self._setup_plot()
-
-        # Step the simulation
-        self.model.update_traffic_light()
-        self.model.inject_vehicle()
-        self.model.apply_nasch_rules()
+        # Step the simulation; only the last of the render_every steps is drawn
+        self.model.advance(self.render_every)
 
-        # Draw everything
-        self._draw_roads()
+        # Update the dynamic artists; the static scenery is not redrawn
         self._draw_traffic_lights()
         self._draw_vehicles()
         self._draw_info_text()
 
-        return self.ax.patches
+        return self._dynamic_artists()
 
     def animate(
         self,
@@ -323,37 +476,78 @@ class TrafficSimulationVisualizer:
         save_path: str = None,
         fps: int = 30,
         bitrate: int = 5000,
+        codec: Optional[str] = None,
+        extra_args: Optional[List[str]] = None,
+        record_only: bool = False,
     ):
         """
         Run the animation.
 
         Args:
-            frames: Number of frames (simulation steps) to run
-            save_path: If provided, save animation to this file path (e.g., 'animation.mp4')
+            frames: Number of frames to run (render_every simulation steps each)
+            save_path: If provided, save animation to this file path (e.g., 'animation.mp4').
+                GIFs are rendered at GIF_MAX_DPI at most and without velocity labels
             fps: Frames per second for saved video (higher = smoother)
             bitrate: Video bitrate in kbps (higher = better quality)
+            codec: ffmpeg video codec for non-GIF files; None picks one with
+                pick_video_encoder()
+            extra_args: Extra ffmpeg arguments for non-GIF files; None uses the
+                ones that go with the picked encoder
+            record_only: Step the model without drawing anything; the figure
+                has already been built by then, so use record_metrics() to
+                skip Matplotlib entirely
+
+        Returns:
+            The FuncAnimation, or with record_only the model's get_metrics()
+            after each frame
         """
+        if record_only:
+            return record_metrics(self.model, frames, self.render_every)
+
         anim = animation.FuncAnimation(
             self.fig,
             self._update_frame,
             frames=frames,
+            init_func=self._init_frame,
             interval=self.interval,
-            blit=False,
+            blit=True,
             repeat=False,
         )
 
         if save_path:
+            gif = save_path.endswith(".gif")
+            dpi = min(self.dpi, GIF_MAX_DPI) if gif else self.dpi
             print(f"Saving animation to {save_path}...")
-            print(f"Settings: DPI={self.dpi}, FPS={fps}, Bitrate={bitrate}kbps")
-            Writer = (
-                animation.writers["pillow"]
-                if save_path.endswith(".gif")
-                else animation.FFMpegWriter
-            )
-            writer = Writer(
-                fps=fps, metadata=dict(artist="Traffic Simulation"), bitrate=bitrate
-            )
-            anim.save(save_path, writer=writer, dpi=self.dpi)
+            print(f"Settings: DPI={dpi}, FPS={fps}, Bitrate={bitrate}kbps")
+            metadata = dict(artist="Traffic Simulation")
+            if gif:
+                print("Note: GIFs are encoded on a single core; .mp4 saves faster")
+                writer = animation.writers["pillow"](
+                    fps=fps, metadata=metadata, bitrate=bitrate
+                )
+            else:
+                if codec is None:
+                    codec, encoder_args = pick_video_encoder()
+                else:
+                    encoder_args = ()
+                if extra_args is not None:
+                    encoder_args = extra_args
+                print(f"Encoder: {codec}")
+                writer = animation.FFMpegWriter(
+                    fps=fps,
+                    codec=codec,
+                    metadata=metadata,
+                    bitrate=bitrate,
+                    # yuv420p keeps the video playable in common players
+                    extra_args=["-pix_fmt", "yuv420p", *encoder_args],
+                )
+            # Velocity labels are unreadable at GIF resolutions
+            show_velocities = self.show_velocities
+            self.show_velocities = show_velocities and not gif
+            try:
+                anim.save(save_path, writer=writer, dpi=dpi)
+            finally:
+                self.show_velocities = show_velocities
             print(f"Animation saved to {save_path}")
         else:
             plt.show()
@@ -377,6 +571,8 @@ def create_and_run_visualization(
     dpi: int = 150,
     fps: int = 30,
     bitrate: int = 5000,
+    render_every: int = 1,
+    backend: Optional[str] = None,
 ):
     """
     Convenience function to create and run a visualization.
@@ -397,6 +593,11 @@ def create_and_run_visualization(
         dpi: Dots per inch for figure resolution (higher = better quality)
         fps: Frames per second for video (higher = smoother)
         bitrate: Video bitrate in kbps (higher = better quality)
+        render_every: Simulation steps per animation frame (1 = draw every step)
+        backend: Matplotlib backend for interactive runs (e.g. "QtAgg", whose
+            canvas blits quickly); None keeps the current backend. Saving
+            always renders off-screen with Agg. The previous backend is
+            restored before returning
     """
     from parameters import ModelParameters
 
@@ -415,11 +616,26 @@ def create_and_run_visualization(
         params=params,
     )
 
-    # Create visualizer and run animation
-    visualizer = TrafficSimulationVisualizer(model, interval=interval, dpi=dpi)
-    return visualizer.animate(
-        frames=frames, save_path=save_path, fps=fps, bitrate=bitrate
-    )
+    # The backend must be chosen before the visualizer creates its figure;
+    # saving needs no GUI window or event loop, only the Agg canvas
+    if save_path:
+        backend = "Agg"
+    previous_backend = plt.get_backend()
+    if backend is not None:
+        plt.switch_backend(backend)
+
+    try:
+        # Create visualizer and run animation
+        visualizer = TrafficSimulationVisualizer(
+            model, interval=interval, dpi=dpi, render_every=render_every
+        )
+        return visualizer.animate(
+            frames=frames, save_path=save_path, fps=fps, bitrate=bitrate
+        )
+    finally:
+        # Figures created later in the session keep the caller's backend
+        if backend is not None and backend != previous_backend:
+            plt.switch_backend(previous_backend)
 
 
 if __name__ == "__main__":